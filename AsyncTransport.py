@@ -0,0 +1,222 @@
+# coding=UTF-8
+import asyncio
+import os
+
+import FrameDecoder
+import ReaderModule
+
+class AsyncTransport:
+    """
+    asyncio transport to the reader.
+
+    await send(frame) writes a command frame, `async for msgTran in transport`
+    yields decoded response frames (Messagetran) as they arrive. Receive
+    needs no thread and no read timeout: the event loop wakes the transport
+    when data is there.
+
+    serWrite() can be called from any thread, so ReaderModule.request works
+    on a transport too; await it with asyncio.wrap_future.
+    """
+    def __init__(self):
+        self.loop = None
+        self.decoder = FrameDecoder.FrameDecoder()
+        self.frames = asyncio.Queue()
+        self.closed = False
+
+    async def open(self):
+        self.loop = asyncio.get_running_loop()
+
+    async def send(self, frame):
+        raise NotImplementedError
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            # Wake the iterator
+            self.frames.put_nowait(None)
+
+    def isConnect(self):
+        return self.loop is not None and not self.closed
+
+    def received(self, data):
+        for msgTran in self.decoder.decode(data):
+            self.frames.put_nowait(msgTran)
+
+    def serWrite(self, frame):
+        asyncio.run_coroutine_threadsafe(self.send(frame), self.loop)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        msgTran = await self.frames.get()
+        if msgTran is None:
+            raise StopAsyncIteration
+        return msgTran
+
+class AsyncSerialTransport(AsyncTransport):
+    """
+    Serial port in non-blocking mode, read and written from the event loop
+    with add_reader / add_writer on its file descriptor (POSIX only)
+    """
+    def __init__(self, port, baudrate):
+        AsyncTransport.__init__(self)
+        self.Port = port
+        self.Baudrate = baudrate
+        self.Serial = None
+        self.writeBuffer = bytearray()
+        self.writeDone = None
+
+    async def open(self):
+        import serial
+        await AsyncTransport.open(self)
+        self.Serial = serial.Serial(port=self.Port, baudrate=self.Baudrate, timeout=0, write_timeout=0)
+        self.fd = self.Serial.fileno()
+        os.set_blocking(self.fd, False)
+        self.writeDone = asyncio.Event()
+        self.writeDone.set()
+        self.loop.add_reader(self.fd, self.readReady)
+
+    def readReady(self):
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.close()
+            return
+        if not data:
+            # Device gone
+            self.close()
+            return
+        self.received(data)
+
+    async def send(self, frame):
+        if self.writeBuffer:
+            self.writeBuffer += frame
+        else:
+            try:
+                written = os.write(self.fd, frame)
+            except BlockingIOError:
+                written = 0
+            if written == len(frame):
+                return
+            self.writeBuffer += frame[written:]
+            self.writeDone.clear()
+            self.loop.add_writer(self.fd, self.writeReady)
+        await self.writeDone.wait()
+
+    def writeReady(self):
+        try:
+            written = os.write(self.fd, self.writeBuffer)
+        except BlockingIOError:
+            return
+        del self.writeBuffer[:written]
+        if not self.writeBuffer:
+            self.loop.remove_writer(self.fd)
+            self.writeDone.set()
+
+    def close(self):
+        if self.Serial is not None and not self.closed:
+            self.loop.remove_reader(self.fd)
+            self.loop.remove_writer(self.fd)
+            self.writeDone.set()
+            self.Serial.close()
+        AsyncTransport.close(self)
+
+class AsyncSocketTransport(AsyncTransport):
+    """
+    TCP reader (network mode) on asyncio streams
+    """
+    def __init__(self, host, port):
+        AsyncTransport.__init__(self)
+        self.Host = host
+        self.Port = port
+        self.reader = None
+        self.writer = None
+        self.readTask = None
+
+    async def open(self):
+        await AsyncTransport.open(self)
+        self.reader, self.writer = await asyncio.open_connection(self.Host, self.Port)
+        self.readTask = self.loop.create_task(self.readLoop())
+
+    async def readLoop(self):
+        try:
+            while True:
+                data = await self.reader.read(4096)
+                if not data:
+                    break
+                self.received(data)
+        except OSError:
+            pass
+        self.readTask = None
+        self.close()
+
+    async def send(self, frame):
+        self.writer.write(frame)
+        await self.writer.drain()
+
+    def close(self):
+        if self.writer is not None and not self.closed:
+            self.writer.close()
+            if self.readTask is not None:
+                self.readTask.cancel()
+        AsyncTransport.close(self)
+
+
+"""
+Inventory on one event loop: the receive side and the round loop are
+coroutines of the same loop, no thread and no read timeout
+usage: python AsyncTransport.py [seconds]   (connection from config.ini)
+"""
+async def inventory(transport, reader, antennaList, seconds):
+    roundDone = asyncio.Event()
+    tags = set()
+
+    async def receive():
+        async for msgTran in transport:
+            reader.resolveResponse(msgTran)
+            if msgTran.cmd != reader.cmd_realtimeInventory:
+                continue
+            record = reader.parseInventory(msgTran.databarr)
+            if type(record) is ReaderModule.InventoryRecord:
+                tags.add(record.epc)
+            else:
+                roundDone.set()
+
+    receiveTask = asyncio.get_running_loop().create_task(receive())
+    cmdAntenna = [reader.setWorkingAntenna(antenna) for antenna in antennaList]
+    cmdInventory = reader.realtimeInventory(reader.realtimeInventoryRepeat)
+    deadline = asyncio.get_running_loop().time() + seconds
+    rounds = 0
+    while asyncio.get_running_loop().time() < deadline:
+        for frame in cmdAntenna:
+            roundDone.clear()
+            await transport.send(frame)
+            await transport.send(cmdInventory)
+            try:
+                await asyncio.wait_for(roundDone.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+            rounds += 1
+    transport.close()
+    await receiveTask
+    print ("rounds: {0}, unique tags: {1}".format(rounds, len(tags)))
+
+async def main(seconds):
+    from configparser import ConfigParser
+    configManager = ConfigParser()
+    configManager.read('config.ini')
+    if configManager.get('Mode', 'mode') == '1':
+        transport = AsyncSocketTransport(configManager.get('Network', 'ip'), int(configManager.get('Network', 'port')))
+    else:
+        transport = AsyncSerialTransport(configManager.get('RS232', 'serialport'), int(configManager.get('RS232', 'baudrate')))
+    await transport.open()
+    reader = ReaderModule.ReaderModule(int(configManager.get('Reader', 'address', fallback='1'), 0))
+    antennaList = [int(antenna) - 1 for antenna in configManager.get('Reader', 'antenna').split(',')]
+    await inventory(transport, reader, antennaList, seconds)
+
+if __name__ == '__main__':
+    import sys
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 10))
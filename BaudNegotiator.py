@@ -0,0 +1,138 @@
+# coding=UTF-8
+import os
+import tempfile
+import time
+
+import FrameDecoder
+
+"""
+Write config to path atomically: temp file in the same directory,
+fsync, then os.replace, so a crash never leaves a half written config.ini
+"""
+def saveConfig(configManager, path='config.ini'):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tempPath = tempfile.mkstemp(prefix='.config.', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as configFile:
+            configManager.write(configFile)
+            configFile.flush()
+            os.fsync(configFile.fileno())
+        os.replace(tempPath, path)
+    except Exception:
+        os.unlink(tempPath)
+        raise
+
+class BaudNegotiator:
+    """
+    Find the reader's baud rate and move the link to the fastest rate
+    that passes an error-rate test.
+
+    detect() probes every rate with getFirmwareVersion. negotiate() then
+    asks the reader for each faster rate (setUartBaudrate), follows on the
+    host side and sends `probes` more commands. A rate passes when at most
+    maxErrorRate of them failed (checksum error, wrong answer or timeout).
+    On failure the reader is sent back to the working rate, and detect()
+    runs again if even that is lost.
+
+    Runs on the connect path, before the receive thread reads the port.
+    connection: RS232 (needs setBaudRate)
+    """
+    # Fastest first, value is the setUartBaudrate argument
+    RATES = ((115200, 0x04), (38400, 0x03))
+
+    def __init__(self, connection, reader, probes=50, maxErrorRate=0.0, timeout=0.2):
+        self.connection = connection
+        self.reader = reader
+        self.probes = probes
+        self.maxErrorRate = maxErrorRate
+        self.timeout = timeout
+        self.decoder = FrameDecoder.FrameDecoder()
+
+    def setRate(self, rate):
+        self.connection.setBaudRate(rate)
+        self.connection.clear()
+        self.decoder.reset()
+
+    """
+    Send frame and wait for the response to cmd, return its data or None
+    """
+    def exchange(self, frame, cmd):
+        self.connection.serWrite(frame)
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            data = self.connection.serRead()
+            if not data:
+                continue
+            for msgTran in self.decoder.decode(data):
+                if msgTran.cmd == cmd:
+                    return msgTran.databarr
+                if msgTran.cmd == 0x00:
+                    # Checksum error
+                    return None
+        return None
+
+    """
+    Return the number of failed probes out of count
+    """
+    def probe(self, rate, count):
+        self.setRate(rate)
+        frame = self.reader.getFirmwareVersion()
+        errors = 0
+        for i in range(count):
+            databarr = self.exchange(frame, self.reader.cmd_getFirmwareVersion)
+            if databarr is None or len(databarr) != 2:
+                errors += 1
+        return errors
+
+    """
+    Rate the reader answers at, None when it answers at none
+    """
+    def detect(self):
+        for rate, code in self.RATES:
+            if self.probe(rate, 3) == 0:
+                return rate
+        return None
+
+    def switch(self, code):
+        databarr = self.exchange(self.reader.setUartBaudrate(code), self.reader.cmd_setUartBaudrate)
+        return databarr is not None and len(databarr) == 1 and databarr[0] == 0x10
+
+    """
+    Return the negotiated rate, None when the reader was not found
+    """
+    def negotiate(self):
+        current = self.detect()
+        if current is None:
+            return None
+        currentCode = dict(self.RATES)[current]
+        for rate, code in self.RATES:
+            if rate <= current:
+                break
+            if not self.switch(code):
+                # Reader refused, it stays at current
+                self.setRate(current)
+                continue
+            errors = self.probe(rate, self.probes)
+            if errors <= self.probes * self.maxErrorRate:
+                return rate
+            # Too many errors, go back to the rate that worked
+            self.switch(currentCode)
+            if self.probe(current, 3) != 0:
+                return self.detect()
+        self.setRate(current)
+        return current
+
+    """
+    Move a link that runs at current to the next slower rate,
+    return the rate the reader answers at afterwards, None when it is lost
+    """
+    def fallback(self, current):
+        slower = [(rate, code) for rate, code in self.RATES if rate < current]
+        if not slower:
+            return current if self.probe(current, 3) == 0 else self.detect()
+        rate, code = slower[0]
+        self.switch(code)
+        # The ack may be lost on a bad link, the probe tells where the reader is
+        if self.probe(rate, 3) == 0:
+            return rate
+        return self.detect()
@@ -0,0 +1,220 @@
+# coding=UTF-8
+import sys
+import time
+
+import MessageTran
+
+class FrameDecoder:
+    """
+    Incremental decoder for 0xA0 framed reader responses.
+
+    Frame: Head(0xA0) Len Address Cmd Data(Len-3) Check
+    Len counts every byte after itself, so a full frame is Len + 2 bytes.
+
+    Received chunks are appended to a ring buffer that is compacted in
+    place instead of being concatenated on every read. Frame boundaries
+    come from the length byte, and the checksum is computed on a
+    memoryview of the buffer, so only the payload of a good frame is copied.
+
+    A checksum failure skips the head byte only: the bad length byte may
+    have swallowed the next frame, so every later 0xA0 is tried as a head
+    until a frame passes length and checksum again. One checksum error is
+    reported for the whole resync, data bytes that look like a head are
+    only counted as discarded. Link counters: goodFrames, checksumErrors,
+    resyncs (bytes skipped to find a head), truncatedFrames (a good frame
+    began inside the span of the bad one) and discardedBytes.
+    """
+    HEAD = 0xA0
+    MIN_LEN = 0x03
+
+    def __init__(self, capacity=4096):
+        self.buffer = bytearray(capacity)
+        self.start = 0
+        self.end = 0
+        self.resetStats()
+
+    def reset(self):
+        self.start = 0
+        self.end = 0
+        self.resyncing = False
+        self.failed = False
+
+    def resetStats(self):
+        self.resyncing = False
+        self.failed = False
+        self.suspectEnd = 0
+        self.goodFrames = 0
+        self.checksumErrors = 0
+        self.resyncs = 0
+        self.truncatedFrames = 0
+        self.discardedBytes = 0
+
+    """
+    Skip count bytes that belong to no frame
+    """
+    def discard(self, count):
+        if not self.resyncing:
+            self.resyncing = True
+            self.resyncs += 1
+        self.discardedBytes += count
+        self.start += count
+
+    def pending(self):
+        return self.end - self.start
+
+    """
+    Append received bytes to the ring buffer
+    """
+    def feed(self, data):
+        dataLen = len(data)
+        if dataLen == 0:
+            return
+        if self.end + dataLen > len(self.buffer):
+            unread = self.end - self.start
+            if unread + dataLen > len(self.buffer):
+                # Grow once; the buffer keeps its size afterwards
+                self.buffer.extend(bytearray(max(len(self.buffer), unread + dataLen)))
+            # Move the unread tail to the front, buffer size does not change
+            self.buffer[0:unread] = self.buffer[self.start:self.end]
+            self.start = 0
+            self.end = unread
+        self.buffer[self.end:self.end + dataLen] = data
+        self.end += dataLen
+
+    """
+    Position of the first complete frame with a good checksum at or after pos, -1 for none
+    """
+    def validHead(self, view, pos):
+        buf = self.buffer
+        while True:
+            head = buf.find(b'\xA0', pos, self.end)
+            if head < 0 or self.end - head < 2:
+                return -1
+            frameEnd = head + buf[head + 1] + 2
+            if buf[head + 1] >= self.MIN_LEN and frameEnd <= self.end and sum(view[head:frameEnd]) & 0xFF == 0:
+                return head
+            pos = head + 1
+
+    """
+    Yield every complete frame as Messagetran with its address byte,
+    checksum error as cmd 0x00
+    """
+    def frames(self):
+        buf = self.buffer
+        with memoryview(buf) as view:
+            while True:
+                head = buf.find(b'\xA0', self.start, self.end)
+                if head < 0:
+                    # No head in buffer, nothing worth keeping
+                    if self.end > self.start:
+                        self.discard(self.end - self.start)
+                    break
+                if head > self.start:
+                    self.discard(head - self.start)
+                if self.end - head < 2:
+                    break
+                frameLen = buf[head + 1] + 2
+                if frameLen < self.MIN_LEN + 2:
+                    # Length byte can not belong to a frame, skip the head
+                    self.discard(1)
+                    continue
+                if self.end - head < frameLen:
+                    if self.resyncing:
+                        # A data byte taken for a head may claim up to 257 bytes,
+                        # take a complete frame found further on instead of waiting
+                        nextHead = self.validHead(view, head + 1)
+                        if nextHead >= 0:
+                            self.discard(nextHead - head)
+                            continue
+                    # Partial frame, wait for more data
+                    break
+                frameEnd = head + frameLen
+                if sum(view[head:frameEnd]) & 0xFF != 0:
+                    self.discard(1)
+                    if not self.failed:
+                        self.failed = True
+                        self.checksumErrors += 1
+                        self.suspectEnd = self.discardedBytes - 1 + frameLen
+                        yield MessageTran.Messagetran(0x00, bytearray())
+                    continue
+                if self.failed and self.discardedBytes < self.suspectEnd:
+                    self.truncatedFrames += 1
+                self.resyncing = False
+                self.failed = False
+                self.start = frameEnd
+                self.goodFrames += 1
+                yield MessageTran.Messagetran(buf[head + 3], bytes(view[head + 4:frameEnd - 1]), buf[head + 2])
+        if self.start == self.end:
+            self.start = 0
+            self.end = 0
+
+    """
+    Feed data and return the list of complete frames
+    """
+    def decode(self, data):
+        self.feed(data)
+        return list(self.frames())
+
+
+"""
+Throughput benchmark against ReaderModule.analyzeDataAllLegacy
+usage: python FrameDecoder.py [dump.bin ...] [--chunk N]
+A dump is the raw byte stream read from the serial port.
+The legacy parser also returns a cmd 0x00 frame for every piece of the
+stream that failed its checksum, only its good frames are counted and
+frames it lost are reported.
+"""
+def synthesize_dump(tagCount=2000):
+    import ReaderModule
+    reader = ReaderModule.ReaderModule()
+    dump = bytearray()
+    for i in range(tagCount):
+        epc = bytearray((0x30, 0x00)) + (0xE2801160600002000000 + i).to_bytes(12, 'big')
+        databarr = bytearray([i & 0x03]) + epc + bytearray([0x50])
+        dump += reader.getCmdWithData(reader.cmd_realtimeInventory, databarr)
+        if i % 50 == 49:
+            dump += reader.getCmdWithData(reader.cmd_realtimeInventory, bytearray([0x00, 0x00, 0x32, 0x00, 0x00, 0x00, 0x32]))
+            dump += reader.getCmdWithData(reader.cmd_getReaderTemperature, bytearray([0x01, 0x2A]))
+    return bytes(dump)
+
+def benchmark(dump, chunkSize):
+    import ReaderModule
+    chunks = [dump[i:i + chunkSize] for i in range(0, len(dump), chunkSize)]
+
+    legacy = ReaderModule.ReaderModule()
+    begin = time.perf_counter()
+    legacyFrames = []
+    for chunk in chunks:
+        legacyFrames += legacy.analyzeDataAllLegacy(chunk)
+    legacyTime = time.perf_counter() - begin
+    legacyBad = sum(1 for msgTran in legacyFrames if msgTran.cmd == 0x00)
+    legacyGood = len(legacyFrames) - legacyBad
+
+    decoder = FrameDecoder()
+    begin = time.perf_counter()
+    decoderFrames = 0
+    for chunk in chunks:
+        decoderFrames += len(decoder.decode(chunk))
+    decoderTime = time.perf_counter() - begin
+
+    print ("bytes: {0}, chunk: {1}".format(len(dump), chunkSize))
+    print ("analyzeDataAllLegacy: {0} frames {1:.3f}s {2:.2f} MB/s ({3} checksum failures not counted)".format(
+        legacyGood, legacyTime, len(dump) / legacyTime / 1e6, legacyBad))
+    print ("FrameDecoder:         {0} frames {1:.3f}s {2:.2f} MB/s".format(decoderFrames, decoderTime, len(dump) / decoderTime / 1e6))
+    if legacyGood != decoderFrames:
+        print ("frame counts differ: analyzeDataAllLegacy lost {0} frames, speedup is not like for like".format(decoderFrames - legacyGood))
+    print ("speedup: {0:.1f}x".format(legacyTime / decoderTime))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    chunkSize = 64
+    if '--chunk' in args:
+        index = args.index('--chunk')
+        chunkSize = int(args[index + 1])
+        del args[index:index + 2]
+    if args:
+        for fileName in args:
+            with open(fileName, 'rb') as dumpFile:
+                benchmark(dumpFile.read(), chunkSize)
+    else:
+        benchmark(synthesize_dump(), chunkSize)
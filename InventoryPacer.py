@@ -0,0 +1,139 @@
+# coding=UTF-8
+import threading
+import time
+
+class AntennaStats:
+    def __init__(self):
+        self.rounds = 0
+        self.timeouts = 0
+        self.roundTime = 0.0
+        self.idleTime = 0.0
+
+class InventoryPacer:
+    """
+    Issue the next inventory round when the previous one finished.
+
+    The inventory thread calls begin() before writing a round command and
+    wait() after it; the receive thread calls complete() when the round's
+    total count (or error) frame arrives. wait() gives up after timeout
+    seconds so a lost frame can not stall the gate.
+
+    Round time is begin -> complete, idle time is the gap between the end
+    of one round and the begin of the next, both per antenna.
+
+    A frame of a timed out round can still arrive during a later round,
+    complete() drops it: a frame naming another antenna than the current
+    round's is late, and after a timeout the first frame that can not be
+    told apart from the missing one is taken as it. When that frame was
+    really lost the round whose frame was taken times out once and does
+    not owe a frame again, so the rounds get back in step.
+    """
+    def __init__(self, timeout=1.0):
+        self.timeout = timeout
+        self.roundDone = threading.Event()
+        self.stats = {}
+        self.antenna = None
+        self.roundStart = 0.0
+        self.lastEnd = None
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.owed = None
+        self.tookLate = None
+        self.lateFrames = 0
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+            self.antenna = None
+            self.lastEnd = None
+            self.owed = None
+            self.tookLate = None
+            self.lateFrames = 0
+            self.roundDone.clear()
+
+    def antennaStats(self, antenna):
+        stats = self.stats.get(antenna)
+        if stats is None:
+            stats = AntennaStats()
+            self.stats[antenna] = stats
+        return stats
+
+    """
+    antenna: 1 ~ 4, 0 for commands covering every antenna
+    """
+    def begin(self, antenna):
+        now = time.monotonic()
+        with self.lock:
+            stats = self.antennaStats(antenna)
+            if self.lastEnd is not None:
+                stats.idleTime += now - self.lastEnd
+            self.sequence += 1
+            self.antenna = antenna
+            self.roundStart = now
+            self.roundDone.clear()
+
+    """
+    Called from the receive thread, antenna: 1 ~ 4 when the frame names it
+    """
+    def complete(self, antenna=None):
+        with self.lock:
+            if self.antenna is None:
+                return
+            if self.owed is not None and (antenna is None or not self.owed or antenna == self.owed):
+                # Frame of the timed out round, or one that can not be told apart from it
+                self.owed = None
+                if not self.roundDone.is_set():
+                    self.tookLate = self.sequence
+                self.lateFrames += 1
+                return
+            if self.roundDone.is_set():
+                return
+            if antenna is not None and self.antenna and antenna != self.antenna:
+                # Late frame of an earlier round on another antenna
+                self.lateFrames += 1
+                return
+            self.finish()
+
+    def finish(self):
+        now = time.monotonic()
+        stats = self.antennaStats(self.antenna)
+        stats.rounds += 1
+        stats.roundTime += now - self.roundStart
+        self.lastEnd = now
+        self.roundDone.set()
+
+    """
+    Return False when the watchdog expired
+    """
+    def wait(self):
+        if self.roundDone.wait(self.timeout):
+            return True
+        now = time.monotonic()
+        with self.lock:
+            if self.roundDone.is_set():
+                return True
+            stats = self.antennaStats(self.antenna)
+            stats.timeouts += 1
+            stats.roundTime += now - self.roundStart
+            self.lastEnd = now
+            if self.tookLate != self.sequence:
+                self.owed = self.antenna
+            # No round is running until the next begin()
+            self.roundDone.set()
+        return False
+
+    def report(self):
+        lines = []
+        for antenna in sorted(self.stats):
+            stats = self.stats[antenna]
+            rounds = stats.rounds + stats.timeouts
+            if rounds == 0:
+                continue
+            busy = stats.roundTime + stats.idleTime
+            dutyCycle = stats.roundTime / busy * 100 if busy > 0 else 0.0
+            lines.append("Ant {0}: rounds {1}, timeouts {2}, round {3:.1f}ms, idle {4:.1f}ms, duty cycle {5:.1f}%".format(
+                antenna if antenna else "all", rounds, stats.timeouts,
+                stats.roundTime / rounds * 1000, stats.idleTime / rounds * 1000, dutyCycle))
+        if self.lateFrames:
+            lines.append("Late round frames dropped: {0}".format(self.lateFrames))
+        return lines
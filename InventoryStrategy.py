@@ -0,0 +1,149 @@
+# coding=UTF-8
+import random
+import sys
+
+class InventoryStrategy:
+    """
+    Session / target selection for each inventory round.
+
+    session: S0 ~ S3, target: A, B or AB (from [Reader] session / target)
+    S0            every tag answers every round (realtime inventory 0x89)
+    S1 ~ S3, A/B  inventory one target until a full antenna cycle reads
+                  nothing, then flip to the other target (0x8B)
+    S1 ~ S3, AB   dual target, alternate A and B every cycle (0x8B)
+
+    In S1 ~ S3 a tag that has been read moves to the other target and
+    keeps quiet, so strong tags stop crowding the weak ones out.
+    """
+    SESSIONS = {'S0': 0x00, 'S1': 0x01, 'S2': 0x02, 'S3': 0x03}
+    TARGETS = {'A': 0x00, 'B': 0x01}
+
+    def __init__(self, session, target, repeat=0x01):
+        session = session.strip().upper()
+        target = target.strip().upper()
+        self.session = self.SESSIONS.get(session, 0x00)
+        self.dualTarget = target == 'AB' and self.session != 0x00
+        self.flipping = self.session != 0x00 and not self.dualTarget
+        self.startTarget = self.TARGETS.get(target[0:1], 0x00)
+        self.target = self.startTarget
+        self.repeat = repeat
+        self.cycleCount = 0
+
+    def reset(self):
+        self.target = self.startTarget
+        self.cycleCount = 0
+
+    def name(self):
+        if self.session == 0x00:
+            return "S0"
+        if self.dualTarget:
+            return "S{0} AB".format(self.session)
+        return "S{0} {1}-flip".format(self.session, "B" if self.startTarget else "A")
+
+    """
+    Command frame of the next round
+    """
+    def command(self, reader):
+        if self.session == 0x00 and self.target == 0x00:
+            return reader.realtimeInventory(reader.realtimeInventoryRepeat)
+        return reader.customizeSessionTargetInventory(self.session, self.target, self.repeat)
+
+    """
+    Tag reads reported by a round's total count response
+    """
+    def roundComplete(self, count):
+        self.cycleCount += count
+
+    """
+    Every antenna had its round
+    """
+    def cycleComplete(self):
+        if self.dualTarget or (self.flipping and self.cycleCount == 0):
+            self.target ^= 0x01
+        self.cycleCount = 0
+
+
+"""
+Simulated tag population: time to read every tag once per strategy
+usage: python InventoryStrategy.py [tags] [runs]
+
+Each round every participating tag answers with its per-antenna read
+probability, the round reads at most `slots` of the answering tags
+(anti-collision capacity) and costs a base time plus a time per slot.
+S1 flags return to A after `persistence` seconds, S2/S3 flags hold
+while the field is on.
+"""
+class SimulatedTag:
+    def __init__(self, probabilities):
+        self.probabilities = probabilities
+        self.flag = 0x00
+        self.flagTime = 0.0
+        self.read = False
+
+class TagPopulationSimulator:
+    def __init__(self, tagCount, antennaCount=4, weakRatio=0.2, seed=None):
+        self.random = random.Random(seed)
+        self.tags = []
+        for i in range(tagCount):
+            if self.random.random() < weakRatio:
+                # Far side of the pallet, only one antenna sees it, poorly
+                probabilities = [0.0] * antennaCount
+                probabilities[self.random.randrange(antennaCount)] = self.random.uniform(0.05, 0.2)
+            else:
+                probabilities = [self.random.uniform(0.6, 1.0) for a in range(antennaCount)]
+            self.tags.append(SimulatedTag(probabilities))
+        self.antennaCount = antennaCount
+        self.slots = 16
+        self.baseTime = 0.004
+        self.slotTime = 0.0015
+        self.persistence = 2.0
+
+    def run(self, strategy, limit=30.0):
+        for tag in self.tags:
+            tag.flag = 0x00
+            tag.read = False
+        strategy.reset()
+        now = 0.0
+        unread = len(self.tags)
+        while unread > 0 and now < limit:
+            for antenna in range(self.antennaCount):
+                if strategy.session == 0x01:
+                    for tag in self.tags:
+                        if tag.flag != 0x00 and now - tag.flagTime > self.persistence:
+                            tag.flag = 0x00
+                answering = [tag for tag in self.tags
+                             if (strategy.session == 0x00 or tag.flag == strategy.target)
+                             and self.random.random() < tag.probabilities[antenna]]
+                self.random.shuffle(answering)
+                readTags = answering[0:self.slots]
+                now += self.baseTime + self.slotTime * max(len(answering), 1)
+                for tag in readTags:
+                    if not tag.read:
+                        tag.read = True
+                        unread -= 1
+                    if strategy.session != 0x00:
+                        tag.flag ^= 0x01
+                        tag.flagTime = now
+                strategy.roundComplete(len(readTags))
+                if unread == 0:
+                    break
+            strategy.cycleComplete()
+        return now if unread == 0 else None
+
+if __name__ == '__main__':
+    tagCount = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    strategies = [InventoryStrategy('S0', 'A'), InventoryStrategy('S1', 'A'),
+                  InventoryStrategy('S2', 'A'), InventoryStrategy('S2', 'AB')]
+    print ("{0} tags, {1} runs, time to read all tags".format(tagCount, runs))
+    for strategy in strategies:
+        times = []
+        for run in range(runs):
+            simulator = TagPopulationSimulator(tagCount, seed=run)
+            times.append(simulator.run(strategy))
+        done = [t for t in times if t is not None]
+        if done:
+            print ("{0:10} mean {1:.3f}s  max {2:.3f}s  incomplete {3}/{4}".format(
+                strategy.name(), sum(done) / len(done), max(done), len(times) - len(done), runs))
+        else:
+            print ("{0:10} incomplete {1}/{2}".format(strategy.name(), runs, runs))
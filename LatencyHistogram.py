@@ -0,0 +1,52 @@
+# coding=UTF-8
+import bisect
+import threading
+
+class LatencyHistogram:
+    """
+    Command latency (request sent -> response decoded) in fixed buckets.
+    bounds are bucket upper limits in milliseconds, the last bucket is open.
+    title / unit / scale name the report lines and convert added values,
+    so other sizes (tag batch sizes: unit "", scale 1) share the buckets.
+    """
+    BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+    def __init__(self, bounds=BOUNDS, title="Latency", unit="ms", scale=1000):
+        self.bounds = bounds
+        self.title = title
+        self.unit = unit
+        self.scale = scale
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.maximum = 0.0
+
+    """
+    value: one measured latency in seconds (times scale)
+    """
+    def add(self, value):
+        value = value * self.scale
+        with self.lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.total += value
+            self.maximum = max(self.maximum, value)
+
+    def count(self):
+        return sum(self.counts)
+
+    def report(self):
+        count = self.count()
+        if count == 0:
+            return ["{0}: no samples".format(self.title)]
+        lines = ["{0}: {1} samples, mean {2:.1f}{4}, max {3:.1f}{4}".format(self.title, count, self.total / count, self.maximum, self.unit)]
+        lower = 0
+        for index, samples in enumerate(self.counts):
+            label = "<= {0}{1}".format(self.bounds[index], self.unit) if index < len(self.bounds) else "> {0}{1}".format(lower, self.unit)
+            if samples:
+                lines.append("  {0:>9}: {1:6} {2}".format(label, samples, '#' * max(1, samples * 40 // count)))
+            if index < len(self.bounds):
+                lower = self.bounds[index]
+        return lines
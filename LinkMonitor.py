@@ -0,0 +1,100 @@
+# coding=UTF-8
+import time
+from collections import deque, namedtuple
+
+"""
+FrameDecoder counters at one instant
+"""
+LinkSample = namedtuple('LinkSample', 'time goodFrames checksumErrors resyncs truncatedFrames discardedBytes')
+
+class LinkMonitor:
+    """
+    Link quality from the FrameDecoder counters over the last window seconds.
+
+    sample() is called from the receive loop, at most every interval
+    seconds it stores the counters and returns the recovery action due:
+    'reconnect', 'fallback' (slower baud rate), 'flush' (drop the input
+    buffer) or None. Errors are checksum errors plus truncated frames in
+    the window, each threshold is in errors per window, 0 disables it.
+    After an action the window starts again, so the next action needs
+    fresh errors and a flush that did not help escalates to fallback,
+    then reconnect.
+    """
+    ACTIONS = ('flush', 'fallback', 'reconnect')
+
+    def __init__(self, decoder, flush=10, fallback=30, reconnect=60, window=60.0, interval=1.0):
+        self.decoder = decoder
+        self.thresholds = {'flush': flush, 'fallback': fallback, 'reconnect': reconnect}
+        self.window = window
+        self.interval = interval
+        self.samples = deque()
+        self.reset()
+
+    def snapshot(self):
+        decoder = self.decoder
+        return LinkSample(time.monotonic(), decoder.goodFrames, decoder.checksumErrors, decoder.resyncs,
+                          decoder.truncatedFrames, decoder.discardedBytes)
+
+    """
+    Start the report totals and the window again
+    """
+    def reset(self):
+        self.actionCounts = dict.fromkeys(self.ACTIONS, 0)
+        self.escalation = 0
+        self.baseline = self.snapshot()
+        self.restart()
+
+    def restart(self):
+        self.samples.clear()
+        self.samples.append(self.snapshot())
+
+    """
+    Counter increase over the window as a LinkSample (time is the span in seconds)
+    """
+    def delta(self):
+        return self.difference(self.samples[-1], self.samples[0])
+
+    @staticmethod
+    def difference(last, first):
+        return LinkSample(*(now - then for now, then in zip(last, first)))
+
+    def errors(self, delta):
+        return delta.checksumErrors + delta.truncatedFrames
+
+    def sample(self):
+        now = time.monotonic()
+        if now - self.samples[-1].time < self.interval:
+            return None
+        self.samples.append(self.snapshot())
+        while len(self.samples) > 2 and now - self.samples[1].time >= self.window:
+            self.samples.popleft()
+        delta = self.delta()
+        errors = self.errors(delta)
+        if errors == 0 and delta.goodFrames:
+            # Link healthy again
+            self.escalation = 0
+        level = -1
+        for index, action in enumerate(self.ACTIONS):
+            threshold = self.thresholds[action]
+            if threshold and errors >= threshold:
+                level = index
+        if level < 0:
+            return None
+        return self.act(self.ACTIONS[min(level + self.escalation, len(self.ACTIONS) - 1)])
+
+    def act(self, action):
+        self.actionCounts[action] += 1
+        self.escalation += 1
+        self.restart()
+        return action
+
+    """
+    Totals since reset()
+    """
+    def report(self):
+        delta = self.difference(self.snapshot(), self.baseline)
+        perMinute = 60.0 / max(delta.time, 1.0)
+        return ["Link: {0} frames, {1} checksum errors, {2} resyncs, {3} truncated, {4} bytes discarded in {5:.0f}s".format(
+                    delta.goodFrames, delta.checksumErrors, delta.resyncs, delta.truncatedFrames, delta.discardedBytes, delta.time),
+                "Link: {0:.1f} errors/min, {1:.0f} bytes discarded/min".format(self.errors(delta) * perMinute, delta.discardedBytes * perMinute),
+                "Link recovery: {0}".format(", ".join("{0} {1}".format(action, self.actionCounts[action]) for action in self.ACTIONS))]
@@ -6,7 +6,6 @@ from ctypes import *
 import os
 import sys
 import time
-import datetime
 import logging
 import logging.config
 from logging.handlers import RotatingFileHandler
@@ -24,6 +23,16 @@ import SuperIOModule
 import EncodeTag
 import RecordModule
 import Database
+import InventoryPacer
+import InventoryStrategy
+import TagSelect
+import BaudNegotiator
+import TrafficCapture
+import LinkMonitor
+import ReaderState
+import TagStore
+import TagEvents
+import ReadClock
 
 def trap_exc_during_debug(*args):
     # when app raises uncaught exception, print info
@@ -56,7 +65,6 @@ class Worker(QtCore.QThread):
 class MainWindow(QMainWindow, Ui_MainWindow):
 
     monitorSignal = QtCore.pyqtSignal()
-    inventorySingal = QtCore.pyqtSignal(dict)
     readAsciiSingal = QtCore.pyqtSignal(str)
 
     def __init__(self, gpio, parent=None):
@@ -81,9 +89,16 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.worker.start()
         #self.monitorSignal.emit()
         
-        self.inventorySingal.connect(self.inventoryUI)
         self.readAsciiSingal.connect(self.readAsciiUI)
 
+        # Tag reads reach the table in one batch per frame tick
+        self.tagEvents = TagEvents.TagEventQueue()
+        # Last tag read, (EPC, RSSI) from the receive thread
+        self.lastRead = None
+        self.tagTimer = QtCore.QTimer(self)
+        self.tagTimer.timeout.connect(self.deliver_tags)
+        self.tagTimer.start(50)
+
         # logging setting
         logging.config.fileConfig('logging.conf')
         self.logger = logging.getLogger('root')
@@ -102,28 +117,42 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         # Idel Time & Change Antenna
         self.btWorkAntenna = 0
-        self.nCommand = 0
         
         # ConfigParser
         self.configManager = ConfigParser()
         self.configManager.read('config.ini')
 
         # Restore Config
-        self.session = 0
-        self.target = 0
+        # Session / target of the realtime inventory rounds: S0, S1 ~ S3 with A / B flipping or AB dual target
+        self.strategy = InventoryStrategy.InventoryStrategy(self.configManager.get('Reader', 'session', fallback='S0'),
+                                                            self.configManager.get('Reader', 'target', fallback='A'))
         self.region = 'VN (918.9 - 922.9)'
         self.cfgIp = self.configManager.get('Network', 'ip')
         self.cfgPort = self.configManager.get('Network', 'port')
         self.cfgRS232Port = self.configManager.get('RS232', 'serialport')
         self.cfgRS232Baudrate = self.configManager.get('RS232', 'baudrate')
         self.readerId = self.configManager.get('Reader', 'id')
+        # RF link profile 0xD0 ~ 0xD3 (hex), empty keeps the reader's
+        self.linkProfile = self.configManager.get('Reader', 'profile', fallback='')
+        self.linkProfile = int(self.linkProfile, 16) if self.linkProfile else None
+
+        # Inventory strategy: realtime (0x89 per antenna), fastswitch (0x8A, all antennas in one command)
+        # or buffered (0x80 per antenna, reader dedups, buffer pulled with 0x91 once per round)
+        # stay: inventory rounds per antenna for fastswitch and buffered
+        self.inventoryMode = self.configManager.get('Reader', 'inventory', fallback='realtime')
+        self.fastSwitchStay = int(self.configManager.get('Reader', 'stay', fallback='1'))
+        self.fastSwitchInterval = int(self.configManager.get('Reader', 'interval', fallback='0'))
 
         # Tag quantity
         self.quantity = 0
         
         # Connection Mode     
         self.socket = SocketModule.SocketModule(self.cfgIp, int(self.cfgPort))
-        self.rs232 = SerialportModule.RS232(self.cfgRS232Port, self.cfgRS232Baudrate)
+        # lowlatency: serial reads return when the received frames are complete, not on the read timeout
+        self.rs232 = SerialportModule.RS232(self.cfgRS232Port, self.cfgRS232Baudrate,
+                                            self.configManager.get('RS232', 'lowlatency', fallback='on') == 'on')
+        # serialnumber: pick the port by the USB adapter's serial number, serialport is the fallback
+        self.rs232.serialNumber = self.configManager.get('RS232', 'serialnumber', fallback='')
         self.configMode = self.configManager.get('Mode', 'mode')
         if self.configMode == "1": # Socket Mode
             try:
@@ -137,10 +166,17 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             except Exception as err:
                 self.logger.debug(err)
             self.logger.debug("RS232 connect status: " + str(self.rs232.isConnect()))
+        elif self.configMode == "3": # Replay Mode, reader traffic from a capture file
+            self.connection = TrafficCapture.ReplayTransport(self.configManager.get('Capture', 'replay'),
+                                                             float(self.configManager.get('Capture', 'speed', fallback='1')))
+        # Capture file of the raw TX / RX traffic, empty for none
+        self.captureFile = self.configManager.get('Capture', 'file', fallback='')
             
-        # Current Setting
+        # Current Setting, read from the reader at connect (load_reader_state)
         self.curRegion = 0
         self.curPower = [0,0,0,0]
+        self.curProfile = None
+        self.curSelect = False
         
         self.url = self.configManager.get('Database', 'url')
         self.dbType = ['SQLSERVER', 'MYSQL', 'RESTAPI']
@@ -170,6 +206,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         
         # RF Power
         self.rfPowerList = self.configManager.get('RF', 'dbm').split(',')
+
+        # Tag select masks, tags outside them are not inventoried by the reader
+        self.tagSelect = TagSelect.TagSelect(self.configManager.get('Select', 'masks', fallback=''),
+                                             self.configManager.get('Select', 'target', fallback='SL'))
         
         # Init UI Status
         self.disable_Connect_Group(True)
@@ -215,7 +255,30 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.localRecorder = RecordModule.RecordModule()
 
         # Reader Moudle
-        self.reader = ReaderModule.ReaderModule()                
+        # address: this gate's reader on a shared RS-485 bus, frames of other readers are skipped
+        self.reader = ReaderModule.ReaderModule(int(self.configManager.get('Reader', 'address', fallback='1'), 0))                
+
+        # Response handlers by command, see analyze_data
+        self.responseHandlers = {
+            self.reader.cmd_read: self.process_read_tag,
+            self.reader.cmd_realtimeInventory: self.process_realtime_inventory,
+            self.reader.cmd_customizedSessionTargetInventory: self.process_realtime_inventory,
+            self.reader.cmd_fastSwitchInventory: self.process_fast_switch_inventory,
+            self.reader.cmd_inventory: self.process_buffer_inventory,
+            self.reader.cmd_get_inventory_buffer: self.process_inventory_buffer,
+            self.reader.cmd_get_and_reset_inventory_buffer: self.process_inventory_buffer,
+            self.reader.cmd_setTemporaryOutputPower: self.process_set_temporary_output_power,
+            self.reader.cmd_setReaderId: self.process_set_reader_id,
+            self.reader.cmd_getReaderId: self.process_get_reader_id,
+            self.reader.cmd_setUartBaudrate: self.process_set_baudrate,
+            self.reader.cmd_setWorkingAntenna: self.process_set_work_antenna,
+            self.reader.cmd_setOutputPower: self.process_set_output_power,
+            self.reader.cmd_getOutputPower: self.process_get_output_power,
+            self.reader.cmd_setFrequencyRegion: self.process_set_frequency_region,
+            self.reader.cmd_tag_select: self.process_tag_select,
+            self.reader.cmd_getReaderTemperature: self.process_get_reader_temperature,
+            self.reader.cmd_reset_inventory_buffer: self.process_reset_inventory_buffer,
+        }
         
         # Database Column
         if self.epcCol != "":
@@ -265,7 +328,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         header2.setSectionResizeMode(5, QHeaderView.ResizeToContents)
         header2.setSectionResizeMode(6, QHeaderView.ResizeToContents)
 
-        self.tags = []
+        # Read timestamps (monotonic ns), formatted for display only
+        self.clock = ReadClock.ReadClock()
+        # Tags of this session by EPC, inventoryUI gets new tags only
+        self.tagStore = TagStore.TagStore()
+        # Tags read again within ttl seconds are not looked up again, across triggers
+        self.tagDedup = TagStore.TagDedup(float(self.configManager.get('Dedup', 'ttl', fallback='0')))
+        self.suppressedTags = 0
+        # Stray read filter: reads (count) within window (seconds), rssi: dBm per antenna or one for all
+        rssiThresholds = self.configManager.get('Qualify', 'rssi', fallback='')
+        self.tagQualifier = TagStore.TagQualifier(int(self.configManager.get('Qualify', 'reads', fallback='1')),
+                                                  float(self.configManager.get('Qualify', 'window', fallback='1')),
+                                                  [int(value) for value in rssiThresholds.split(',') if value.strip()])
         
         # Inventory Time Consume
         self.passingTime = 0
@@ -289,9 +363,23 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         #self.queue = Queue()
         self._sentinel = object()
         
-        self.inventoryRate = 1 # Use to dynamic control inventory command frequency
-        self.blSetPower = False
-        self.blSetFrequency = False
+        # Next inventory round is sent when the previous round's total count arrives,
+        # roundtimeout (seconds) is the watchdog for a lost response
+        self.pacer = InventoryPacer.InventoryPacer(float(self.configManager.get('Reader', 'roundtimeout', fallback='1')))
+
+        # Link quality: checksum errors + truncated frames per window (seconds) that trigger
+        # an input flush, a slower baud rate (serial only) or a reconnect, 0 disables a step
+        self.linkMonitor = None
+        if self.configManager.get('Link', 'monitor', fallback='on') == 'on':
+            self.linkMonitor = LinkMonitor.LinkMonitor(self.reader.decoder,
+                                                       int(self.configManager.get('Link', 'flush', fallback='10')),
+                                                       int(self.configManager.get('Link', 'fallback', fallback='30')),
+                                                       int(self.configManager.get('Link', 'reconnect', fallback='60')),
+                                                       float(self.configManager.get('Link', 'window', fallback='60')))
+        # Recovery waits until the inventory thread parked between rounds, see check_link
+        self.linkAction = None
+        self.inventoryPause = threading.Event()
+        self.inventoryIdle = threading.Event()
         
         
     """
@@ -306,6 +394,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.btn_stop_click()
             print ("Application exit")
             self.lbAppStatus.setText("Application exit")
+            self.connection.stopCapture()
             self.socket.disConnect()
             self.rs232.disConnect()
             event.accept()
@@ -316,10 +405,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     Check connect status
     """
     def check_connect(self):
-        if self.socket.isConnect() == False and self.rs232.isConnect() == False:
-            return False
-        else:
-            return True
+        return self.connection.isConnect()
 
     """
     Realtime Inventory Process
@@ -341,8 +427,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         
         if self.blInventory:
             print (f"Initializing...", end="")
-            self.initialize_power()
-            self.initialize_region()
+            self.initialize_settings()
+            self.initialize_select()
             print ("Done")
             self.lbAppStatus.setText("Initializing...Done")
             
@@ -351,13 +437,32 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             
             # Initial Setting
             nIndexAntenna = 0
-            self.nCommand = 0
-            self.session = 0
-            self.target = 0
+            self.pacer.reset()
+            self.strategy.reset()
+            self.reader.latency.reset()
+            self.connection.resetWriteStats()
+            if self.linkMonitor is not None:
+                self.linkMonitor.reset()
+            self.linkAction = None
+            self.inventoryPause.clear()
+            self.inventoryIdle.clear()
+            self.suppressedTags = 0
+            self.tagEvents.resetStats()
+            self.tagQualifier.resetStats()
+
+            # Prebuilt command frames, the loop only writes them
+            cmdTemperature = self.reader.getReaderTemperature()
+            cmdAntenna = [self.reader.setWorkingAntenna(int(ant) - 1) for ant in self.antenna]
+            cmdFastSwitch = self.reader.fastSwitchInventory([int(ant) - 1 for ant in self.antenna],
+                                                            self.fastSwitchStay, self.fastSwitchInterval, 0x01)
+            cmdBufferInventory = self.reader.bufferInventory(self.fastSwitchStay)
+            cmdGetBuffer = self.reader.getAndResetInventoryBuffer()
             print ("Start reading...")
             self.lbAppStatus.setText("Start reading...")
 
         while self.blInventory:  
+            # Link recovery runs between rounds, no read of a round is lost to it
+            self.wait_link()
             # Local and DB Recording Process
             self.gpio.detect_sensor()
             if not self.gpio.inventory_check() or not self.check_connect():
@@ -366,36 +471,49 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 self.logger.debug("No Sensor Detect and Start Monitor!")
                 self.connection.clear()
             try:
-                # Test get reader temperature
-                self.connection.serWrite(self.reader.getReaderTemperature())
-
-                # Inventory command
-                if nIndexAntenna < len(self.antenna)-1 or self.nCommand == 0:
-                    if self.nCommand == 0:
-                        self.nCommand = 1
-                        self.logger.debug("Send Realtime Inventory Command!")
-                        self.connection.serWrite(self.reader.realtimeInventory(self.reader.realtimeInventoryRepeat))
-                        #self.connection.serWrite(self.reader.customizeSessionTargetInventory(self.session, self.target, 0x01))
-                    else:
-                        # Change antenna command
-                        self.nCommand = 0
-                        nIndexAntenna = nIndexAntenna + 1
-                        self.btWorkAntenna = int(self.antenna[nIndexAntenna]) - 1
-                        self.connection.serWrite(self.reader.setWorkingAntenna(self.btWorkAntenna))
+                # Test get reader temperature, leaves in the same write() as the round command
+                self.connection.queueWrite(cmdTemperature)
+
+                # Inventory command, each round is sent once the previous one ended
+                if self.inventoryMode == "fastswitch":
+                    self.logger.debug("Send Fast Switch Inventory Command!")
+                    self.pacer.begin(0)
+                    self.connection.serWrite(cmdFastSwitch)
+                    self.pacer.wait()
+                elif self.inventoryMode == "buffered":
+                    self.buffered_inventory_round(cmdAntenna, cmdBufferInventory, cmdGetBuffer)
                 else:
-                    # Set antenna to 1
-                    self.nCommand = 0
-                    nIndexAntenna = 0
+                    # Change antenna command, reader handles it before the inventory command
                     self.btWorkAntenna = int(self.antenna[nIndexAntenna]) - 1
-                    self.connection.serWrite(self.reader.setWorkingAntenna(self.btWorkAntenna))
-                
-                # When Tag Quantity is small, sleep short. When quantity is large, sleep long
-                # Dynamic Inventory Time Delay
-                time.sleep(self.inventoryRate/100)
+                    self.connection.queueWrite(cmdAntenna[nIndexAntenna])
+                    # S0 A is the realtime inventory (0x89), other sessions / targets use 0x8B
+                    self.logger.debug("Send {0} Inventory Command!".format(self.strategy.name()))
+                    self.pacer.begin(self.btWorkAntenna + 1)
+                    self.connection.serWrite(self.strategy.command(self.reader))
+                    if not self.pacer.wait():
+                        self.logger.debug("Inventory round timeout!")
+                    nIndexAntenna = (nIndexAntenna + 1) % len(cmdAntenna)
+                    if nIndexAntenna == 0:
+                        self.strategy.cycleComplete()
                 
             except Exception as err:
                 self.logger.debug("Error: {0}".format(err))
-                
+
+        # Radio duty cycle of this inventory
+        for line in self.pacer.report():
+            self.logger.debug(line)
+        if self.tagSelect.active():
+            self.logger.debug(self.tagSelect.report())
+        for line in self.reader.latency.report():
+            self.logger.debug(line)
+        self.logger.debug(self.connection.writeReport())
+        for line in self.tagEvents.report():
+            self.logger.debug(line)
+        self.logger.debug(self.tagQualifier.report(self.tagStore))
+        self.logger.debug("Dedup: {0} tags suppressed, {1} within TTL".format(self.suppressedTags, len(self.tagDedup)))
+        if self.linkMonitor is not None:
+            for line in self.linkMonitor.report():
+                self.logger.debug(line)
                 
     @QtCore.pyqtSlot()            
     def processUI(self):
@@ -429,63 +547,71 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             if data:
                 msgTranArr = self.reader.analyzeDataAll(data)
                 self.analyze_data(msgTranArr)
+            if self.linkMonitor is not None:
+                self.check_link(not data)
+
+    """
+    Recovery when the link quality crossed a threshold,
+    runs in the receive thread so nothing else reads the port meanwhile.
+    It waits until the inventory thread parked between rounds (wait_link)
+    and a read came back empty (quiet), so no tag read is thrown away
+    """
+    def check_link(self, quiet=True):
+        if self.linkAction is None:
+            action = self.linkMonitor.sample()
+            if action is None:
+                return
+            self.logger.debug("Link quality: {0}, pausing inventory".format(action))
+            self.linkAction = action
+            self.inventoryPause.set()
+            return
+        if not self.inventoryIdle.is_set() or not quiet:
+            # The round in flight (and a buffer transfer) still ends on the normal receive path
+            return
+        action = self.linkAction
+        try:
+            if action == 'fallback' and self.connection is self.rs232:
+                negotiator = BaudNegotiator.BaudNegotiator(self.rs232, self.reader)
+                rate = negotiator.fallback(int(self.rs232.getBaudRate()))
+                self.logger.debug("Link quality: baudrate {0}".format(rate))
+                if rate is None:
+                    action = 'reconnect'
+            if action == 'reconnect':
+                self.connection.disConnect()
+                self.connection.connect()
+            self.connection.clear()
+        except Exception as err:
+            self.logger.debug("Error: {0}".format(err))
+        self.reader.decoder.reset()
+        self.linkMonitor.restart()
+        self.linkAction = None
+        self.inventoryIdle.clear()
+        self.inventoryPause.clear()
+
+    """
+    Inventory thread, between rounds: wait while check_link recovers the link
+    """
+    def wait_link(self):
+        if not self.inventoryPause.is_set():
+            return
+        self.inventoryIdle.set()
+        while self.inventoryPause.is_set() and self.blInventory:
+            time.sleep(0.01)
+        self.inventoryIdle.clear()
 
     """
     Analyze Data Process
     """
     def analyze_data(self, msgTranlist):
         for msgTran in msgTranlist:
-            if msgTran.cmd == 0x00:
-                self.logger.debug("Error: Checksum is not correct!")
-                continue
-            elif msgTran.cmd == 0x81:
-                self.process_read_tag(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x82:
-                self.process_write_tag(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x89:
-                self.process_realtime_inventory(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x8B:
-                try:
-                    self.process_realtime_inventory(msgTran.databarr)
-                except ex:
-                    self.logger.debug(ex)
-                continue
-            elif msgTran.cmd == 0x66:
-                self.process_set_temporary_output_power(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x67:
-                self.process_set_reader_id(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x68:
-                self.process_get_reader_id(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x71:
-                self.process_set_baudrate(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x74:
-                self.process_set_work_antenna(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x76:
-                self.process_set_output_power(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x77:
-                self.process_get_output_power(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x78:
-                self.process_set_frequency_region(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x7B:
-                self.process_get_reader_temperature(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x93:
-                self.process_reset_inventory_buffer(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x98:
-                self.process_tag_select(msgTran.databarr)
+            if not self.reader.ownsFrame(msgTran):
                 continue
+            self.reader.resolveResponse(msgTran)
+            handler = self.responseHandlers.get(msgTran.cmd)
+            if handler is not None:
+                handler(msgTran.databarr)
+            elif msgTran.cmd == 0x00:
+                self.logger.debug("Error: Checksum is not correct!")
             else:
                 self.logger.debug("Cannot Recognize")
 
@@ -503,7 +629,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def process_set_baudrate(self, databarr):
         if self.process_error_code(databarr):
             self.configManager.set('RS232', 'baudrate', self.cmbSetBauRate.currentText())
-            self.configManager.write(open('config.ini', 'wb'))
+            BaudNegotiator.saveConfig(self.configManager)
 
     def process_set_work_antenna(self, databarr):
         intCurrentAnt = 0
@@ -512,64 +638,111 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         if self.process_error_code(databarr):
             self.logger.debug(strCmd)
-        else:
-            self.nCommand = 1
 
-    """  
-    Initialize Power and Region
     """
-    def initialize_power(self):
-        if not (self.curPower[0] == int(self.rfPowerList[0]) and
-                self.curPower[1] == int(self.rfPowerList[1]) and
-                self.curPower[2] == int(self.rfPowerList[2]) and
-                self.curPower[3] == int(self.rfPowerList[3])):
-            self.curPower = list(map(int, [self.rfPowerList[0], self.rfPowerList[1], self.rfPowerList[2], self.rfPowerList[3]]))
-            for i in range(len(self.curPower)-1):
-                if self.curPower[i] != self.curPower[i+1]:
-                    self.set_output_power(self.curPower)
-                    break
-                if i == len(self.curPower)-2:
-                    self.set_temporary_output_power(self.curPower[0])                      
-        
-    def initialize_region(self):
+    Initialize Power, Region and RF link profile
+    Only settings that differ from the reader are sent, all of them
+    before the first answer is awaited
+    """
+    def initialize_settings(self):
+        settings = []
+        powerList = list(map(int, self.rfPowerList[0:4]))
+        if self.curPower != powerList:
+            if len(set(powerList)) > 1:
+                settings.append((self.reader.setOutputPower(powerList), self.set_output_power, powerList))
+            else:
+                settings.append((self.reader.setTemporaryOutputPower(powerList[0]), self.set_temporary_output_power, powerList))
         if not self.curRegion == self.region:
-            self.curRegion = self.region
-            self.set_frequency_region(self.curRegion)
+            settings.append((self.reader.setFrequencyRegionByCountry(str(self.region)), self.set_frequency_region, self.region))
+        if self.linkProfile is not None and self.curProfile != self.linkProfile:
+            settings.append((self.reader.setRfLinkProfile(self.linkProfile), self.set_rf_link_profile, self.linkProfile))
+        pending = [(self.reader.request(self.connection, frame), done, value) for frame, done, value in settings]
+        for future, done, value in pending:
+            done(future, value)
+
+    """
+    Program the tag select masks and read them back with tagSelectQuery,
+    tags are still checked on the host when the reader does not confirm them
+    """
+    def initialize_select(self):
+        if self.curSelect:
+            return
+        for frame in self.tagSelect.program(self.reader):
+            if not self.request_setting(frame):
+                return
+        self.tagSelect.beginQuery()
+        try:
+            databarr = self.reader.request(self.connection, self.reader.tagSelectQuery()).result()
+            if len(databarr) > 1:
+                self.tagSelect.queryDone.wait(self.reader.requestTimeout)
+        except Exception as err:
+            self.logger.debug("Error: {0}".format(err))
+            return
+        if self.tagSelect.verify():
+            self.curSelect = True
+            self.logger.debug("Tag select masks: {0}".format(len(self.tagSelect.masks)))
+        else:
+            self.logger.debug("Tag select masks not confirmed by reader, filtering on host")
+
+    """
+    Send setting command and wait for its response, False on error or timeout
+    """
+    def request_setting(self, frame):
+        return self.wait_setting(self.reader.request(self.connection, frame))
+
+    def wait_setting(self, future):
+        try:
+            future.result()
+            return True
+        except Exception as err:
+            print ("Failed")
+            self.logger.debug("Error: {0}".format(err))
+            return False
     
-    def set_output_power(self, powerList):
+    def set_output_power(self, future, powerList):
         print (f"Set output power Ant1: {powerList[0]}dbm, Ant2: {powerList[1]}dbm, Ant3: {powerList[2]}dbm, Ant4: {powerList[3]}dbm ... ", end="")
-        self.blSetPower = False
-        while not self.blSetPower:
-            self.connection.serWrite(self.reader.setOutputPower(powerList))
-            time.sleep(0.2)
+        if not self.wait_setting(future):
+            return False
+        self.curPower = powerList
         print ("Done")
         self.lbAntennaPower.setText(str(powerList[0]) + " dBm")
         self.logger.debug("Set output power successfully")
         self.lbAppStatus.setText(f"Set output power {powerList[0]} | {powerList[1]} | {powerList[2]} | {powerList[3]} dBm  successfully")
+        return True
         
-    def set_temporary_output_power(self, power):
+    def set_temporary_output_power(self, future, powerList):
+        power = powerList[0]
         print (f"Set Temporary Output Power {int(power)}dbm ... ", end="")
-        self.blSetPower = False
-        while not self.blSetPower:
-            self.connection.serWrite(self.reader.setTemporaryOutputPower(int(power)))
-            time.sleep(0.2)
+        if not self.wait_setting(future):
+            return False
+        self.curPower = powerList
         print ("Done")
         self.lbAntennaPower.setText(str(power) + " dBm")
         self.logger.debug("Set Temporary Output Power successfully")
         self.lbAppStatus.setText(f"Set output power {power} dBm successfully")
+        return True
         
-    def set_frequency_region(self, region):
+    def set_frequency_region(self, future, region):
         print (f"Set Frequency Region {region} ... ", end="")
-        self.blSetFrequency = False
-        while not self.blSetFrequency:
-            self.connection.serWrite(self.reader.setFrequencyRegionByCountry(str(region)))
-            time.sleep(0.2)
+        if not self.wait_setting(future):
+            return False
+        self.curRegion = region
         print ("Done")
         self.logger.debug("Set frequency region successfully")
         self.lbAppStatus.setText("Set frequency region successfully")
+        return True
+
+    def set_rf_link_profile(self, future, profile):
+        print ("Set RF Link Profile {0:02X} ... ".format(profile), end="")
+        if not self.wait_setting(future):
+            return False
+        self.curProfile = profile
+        print ("Done")
+        self.logger.debug("Set RF link profile successfully")
+        return True
 
     def process_set_output_power(self, databarr):
-        self.blSetPower = self.process_error_code(databarr)
+        self.process_error_code(databarr)
 
     def process_get_output_power(self, databarr):
         if len(databarr) == 1:
@@ -584,63 +757,41 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             print ("Error")
     
     def process_set_temporary_output_power(self, databarr):
-        self.blSetPower = self.process_error_code(databarr)
+        self.process_error_code(databarr)
             
+    def process_tag_select(self, databarr):
+        record = self.reader.parseTagMask(databarr)
+        if type(record) is ReaderModule.TagMaskRecord:
+            self.tagSelect.queryRecord(record)
+        else:
+            self.process_error_code(databarr)
+
     def process_set_frequency_region(self, databarr):
-        self.blSetFrequency = self.process_error_code(databarr)
+        self.process_error_code(databarr)
 
     def process_get_reader_temperature(self, databarr):
-        for d in databarr:
-            if int(d) > 1:
-                self.lbReaderTemp.setText(str(d))
+        record = self.reader.parseTemperature(databarr)
+        if type(record) is ReaderModule.TemperatureRecord:
+            self.lbReaderTemp.setText(str(record.temperature))
 
     def process_read_tag(self, databarr):
-        dataLen = len(databarr)
         try:
-            if dataLen == 1:
+            record = self.reader.parseReadTag(databarr)
+            if type(record) is ReaderModule.ErrorRecord:
                 self.process_error_code(databarr)
             else:
                 # Turn Digital Output on
                 for port in self.activeDOPortList:
                     self.gpio.set_gpio(port, self.gpio.on)
-                
-                """
-                N:len(databarr)
-                0:2bytes[Tag Count]
-                2:DataLen[]
-                3~N-4:PC(2),EPC(),CRC(2),ReadData()
-                N-3:ReadLen
-                N-2:AntId
-                N-1:ReadCount
-                """
-                
-                nDataLen = databarr[dataLen - 3]
-                nEpcLen = databarr[2] - nDataLen - 4
-                # PC
-                strPC = ""
-                for b in range(3, 5):
-                    strPC += str(hex(databarr[b]))[2:].zfill(2) + ' '
-                strPC = strPC.upper()
-                # EPC
-                strEPC = ""
-                epcEnd = 5 + nEpcLen
-                
-                if epcEnd <= dataLen:
-                    for b in range(3, epcEnd):
-                        nextEPC = str(hex(databarr[b]))[2:].zfill(2)
-                        strEPC += nextEPC + ' '
-                strEPC = strEPC.upper().replace(' ', '')
-
-                # Show Inventory Result         
-                # Antenna
-                if (databarr[dataLen-1] & 0x80) == 0:
-                    ant = (databarr[dataLen-2] & 0x03) + 1
-                else:
-                    ant = (databarr[dataLen-2] & 0x03) + 5
-                
-                if (int(strPC[0:2], 16)/4) <= (epcEnd-4):
-                    if str(ant) in self.antenna:
-                        dtNow = datetime.datetime.now().strftime('%Y/%m/%d %H:%M:%S.%f').split(".")[0]
+
+                # EPC = PC + EPC
+                strEPC = "{0:04X}{1}".format(record.pc, record.epc.hex().upper())
+
+                if ((record.pc >> 8)/4) <= (len(record.epc) + 1):
+                    if str(record.antenna) in self.antenna:
+                        entry = self.new_tag(record)
+                        if entry is None:
+                            return
                         tagInfo = {
                             self.epcCol: strEPC,
                             self.materialCol: 'Get from SQL',
@@ -648,10 +799,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                             self.lotCol: 'Get from SQL',
                             self.quantityCol: 'Get from SQL',
                             self.boxCol: 'Get from SQL',
-                            self.timeCol: dtNow
+                            self.timeCol: entry.lastSeen
                         }
-                        self.inventorySingal.emit(tagInfo)
-                        time.sleep(0.01)   
+                        self.tagEvents.put(tagInfo, entry)
                     
         except Exception as e:
             print (e)
@@ -661,80 +811,156 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     Customized Session Target Inventory Data Analyze
     """
     def process_realtime_inventory(self, databarr):
-        dataLen = len(databarr)
         try:
-            if dataLen == 1:
+            record = self.reader.parseInventory(databarr)
+            if type(record) is ReaderModule.ErrorRecord:
                 print ("Datalen: 1")
                 self.process_error_code(databarr)
-            elif dataLen == 7:
+                self.pacer.complete()
+            elif type(record) is ReaderModule.TotalCountRecord:
                 self.logger.debug("Get Total Count Response!")
-                nReadRate = databarr[1] * 256 + databarr[2]
-                nDataCount = databarr[3] * 256 * 256 * 256 + databarr[4] * 256 * 256 + databarr[5] * 256 + databarr[6]
-                self.logger.debug("Tag Count: " + str(nDataCount))
-                # TODO: calculate related average value
-                self.inventoryRate = (lambda x: x if x>=1 else 1)((self.inventoryRate+nDataCount)/2)
-                if self.inventoryRate > 100:
-                    self.inventoryRate = 1
-                    
+                self.logger.debug("Tag Count: {0}, Read Rate: {1}".format(record.count, record.readRate))
+                self.strategy.roundComplete(record.count)
+                self.pacer.complete(record.antenna + 1)
             else:
-                nEpcLen = dataLen - 2
-                rssiLocation = 1 + nEpcLen
-                strEPC = ""
-                # EPC= PC + EPC, change range to 3, previously 1
-                for b in range(1, 1 + nEpcLen):
-                    strEPC += str(hex(databarr[b]))[2:].zfill(2) + " "
-                strEPC = strEPC.upper().replace(' ', '')
-                dRSSI = databarr[rssiLocation] - 129
-                self.lbRSSI.setText(str(dRSSI))
-                self.logger.debug("Tag: " + strEPC)
-                self.lbAppStatus.setText(f"Tag read: {strEPC}")
-                
-                # Antenna
-                if (databarr[rssiLocation] & 0x80) == 0:
-                    ant = (databarr[0] & 0x03) + 1
-                else:
-                    ant = (databarr[0] & 0x03) + 5
-                
-                if (int(strEPC[0:2], 16)/4) <= (nEpcLen-1):
-                    if str(ant) in self.antenna:
-                        dtNow = datetime.datetime.now().strftime('%Y/%m/%d %H:%M:%S.%f').split(".")[0]
-                        tagInfo = {
-                            self.epcCol: strEPC,
-                            self.materialCol: 'Get from SQL',
-                            self.descCol: 'Get from SQL',
-                            self.lotCol: 'Get from SQL',
-                            self.quantityCol: 'Get from SQL',
-                            self.boxCol: 'Get from SQL',
-                            self.timeCol: dtNow
-                        }
-                        self.inventorySingal.emit(tagInfo)
-                        time.sleep(0.01)
+                self.process_inventory_tag(record)
+
+        except Exception as e:
+            print (e)
+
+    """
+    Fast Switch Antenna Inventory Data Analyze
+    """
+    def process_fast_switch_inventory(self, databarr):
+        try:
+            record = self.reader.parseFastSwitchInventory(databarr)
+            if type(record) is ReaderModule.ErrorRecord:
+                self.process_error_code(databarr)
+                self.pacer.complete()
+            elif type(record) is ReaderModule.AntennaErrorRecord:
+                self.logger.debug("Antenna {0}: {1}".format(record.antenna, ReaderModule.ERROR_CODES.get(record.code, "Unknown Error")))
+            elif type(record) is ReaderModule.FastSwitchTotalRecord:
+                self.logger.debug("Get Fast Switch Total Count Response!")
+                self.logger.debug("Tag Count: {0}, Duration: {1}ms".format(record.count, record.duration))
+                self.pacer.complete()
+            else:
+                self.process_inventory_tag(record)
+
+        except Exception as e:
+            print (e)
+
+    """
+    Buffered inventory round: inventory every antenna into the reader buffer,
+    waiting for each 0x80 summary, then pull the unique tags in one transfer
+    """
+    def buffered_inventory_round(self, cmdAntenna, cmdInventory, cmdGetBuffer):
+        for nIndexAntenna in range(len(cmdAntenna)):
+            try:
+                if len(cmdAntenna) > 1:
+                    self.btWorkAntenna = int(self.antenna[nIndexAntenna]) - 1
+                    self.reader.request(self.connection, cmdAntenna[nIndexAntenna]).result()
+                self.reader.request(self.connection, cmdInventory, timeout=2, retries=0).result()
+            except Exception as err:
+                self.logger.debug("Error: {0}".format(err))
+        self.logger.debug("Send Get And Reset Inventory Buffer Command!")
+        self.connection.serWrite(cmdGetBuffer)
+
+    def process_buffer_inventory(self, databarr):
+        record = self.reader.parseBufferInventory(databarr)
+        if type(record) is ReaderModule.ErrorRecord:
+            self.process_error_code(databarr)
+        else:
+            self.logger.debug("Buffer Tag Count: {0}, Read Rate: {1}, Total Read: {2}".format(record.tagCount, record.readRate, record.count))
 
+    def process_inventory_buffer(self, databarr):
+        try:
+            record = self.reader.parseBufferTag(databarr)
+            if type(record) is ReaderModule.ErrorRecord:
+                self.process_error_code(databarr)
+            else:
+                self.process_inventory_tag(record)
         except Exception as e:
             print (e)
 
+    """
+    Count the read, return its entry when the tag just qualified and is not within the dedup TTL
+    """
+    def new_tag(self, record, rssi=None):
+        entry = self.tagStore.upsert(record.epc, record.antenna, rssi, record.pc)[0]
+        wasQualified = entry.qualified
+        if not self.tagQualifier.qualify(entry, record.antenna, rssi):
+            return None
+        recent = self.tagDedup.recent(record.epc)
+        if wasQualified:
+            return None
+        if recent:
+            self.suppressedTags += 1
+            self.logger.debug("Tag passed within dedup TTL: " + record.epc.hex().upper())
+            return None
+        return entry
+
+    """
+    Inventory tag record, emit when PC is valid and antenna is enabled
+    """
+    def process_inventory_tag(self, record):
+        if not self.tagSelect.accept(record):
+            return
+        # EPC = PC + EPC
+        strEPC = "{0:04X}{1}".format(record.pc, record.epc.hex().upper())
+        # Shown by deliver_tags once per tick
+        self.lastRead = (strEPC, record.rssi)
+        
+        if ((record.pc >> 8)/4) <= (len(record.epc) + 1):
+            if str(record.antenna) in self.antenna:
+                entry = self.new_tag(record, record.rssi)
+                if entry is None:
+                    return
+                tagInfo = {
+                    self.epcCol: strEPC,
+                    self.materialCol: 'Get from SQL',
+                    self.descCol: 'Get from SQL',
+                    self.lotCol: 'Get from SQL',
+                    self.quantityCol: 'Get from SQL',
+                    self.boxCol: 'Get from SQL',
+                    self.timeCol: entry.lastSeen
+                }
+                self.tagEvents.put(tagInfo, entry)
+
+    """
+    Tag reads queued since the last frame tick, status labels show the last read
+    """
+    @QtCore.pyqtSlot()
+    def deliver_tags(self):
+        lastRead = self.lastRead
+        if lastRead is not None:
+            self.lastRead = None
+            strEPC, rssi = lastRead
+            self.lbRSSI.setText(str(rssi))
+            self.logger.debug("Tag: " + strEPC)
+            self.lbAppStatus.setText(f"Tag read: {strEPC}")
+        batch = self.tagEvents.drain()
+        if not batch:
+            return
+        for tagDict, entry in batch:
+            self.inventoryUI(tagDict, entry)
+        self.tableView.setModel(self.model)
+        self.tableView_2.setModel(self.model2)
+
     #TODO: Major function here, change the viewTable in this function to suitable function.
     #      Call Sql Server here when we get the tag EPC, return the sql server result and populate viewTable
-    @QtCore.pyqtSlot(dict)        
-    def inventoryUI(self, tagDict):
+    def inventoryUI(self, tagDict, entry):
 
         if self.blInventory:
-            # Detect Duplicate
-            hasExist = False
-            
             readEPC = tagDict[self.epcCol]
-            readTime = tagDict[self.timeCol]
-            strData = readEPC
+            readTime = self.clock.format(tagDict[self.timeCol])
             
             i = self.model.rowCount()
             k = self.model2.rowCount()
-            if len(self.tags) > 0:
-                if (strData) in self.tags:
-                    hasExist = True
             
-            if not hasExist:
-                # Update Tags
-                self.tags.append(strData)
+            # Duplicates are dropped by tagStore, a tag arrives here once
+            if entry.row is None:
+                entry.row = i
+                self.tagDedup.commit(entry.epc)
                 strEpcSQL = readEPC[4:]
                 print(f"Tag Read: {strEpcSQL}...", end="")
                 
@@ -903,11 +1129,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 #self.queue.put(tagDict)
                 
                 # Caculate Time Consuming
-                firstTimeTag = datetime.datetime.strptime(str(self.model.data(self.model.index(0, 6))), '%Y/%m/%d %H:%M:%S')
-                lastTimeTag = datetime.datetime.strptime(str(self.model.data(self.model.index(i, 6))), '%Y/%m/%d %H:%M:%S')
-                self.passingTime = round( (lastTimeTag - firstTimeTag).total_seconds(), 3)
-                self.tableView.setModel(self.model)
-                self.tableView_2.setModel(self.model2)
+                self.passingTime = round(self.clock.seconds(self.tagStore.firstSeen, entry.firstSeen), 3)
         
     @QtCore.pyqtSlot(str)        
     def readAsciiUI(self, epc):
@@ -926,129 +1148,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     """
     def process_error_code(self, databarr):
         rtncode = databarr[0]
-        if rtncode == 0x10:
+        if rtncode == ReaderModule.SUCCESS:
             self.logger.debug("Success")
             return True
-        else:
-            # print "Error"
-            # switch Error Code
-            if rtncode == 0x11:
-                self.logger.debug("Command Fail")
-                return False
-            elif rtncode == 0x20:
-                self.logger.debug("MCU Reset Error")
-                return False
-            elif rtncode == 0x21:
-                self.logger.debug("CW On Error")
-                return False
-            elif rtncode == 0x22:
-                self.logger.debug("Antenna Mission Error")
-                return False
-            elif rtncode == 0x23:
-                self.logger.debug("Write Flash Error")
-                return False
-            elif rtncode == 0x24:
-                self.logger.debug("Read Flash Error")
-                return False
-            elif rtncode == 0x25:
-                self.loggger.debug("Set Output Power Error")
-                return False
-            elif rtncode == 0x31:
-                self.logger.debug("Tag Inventory Error")
-                return False
-            elif rtncode == 0x32:
-                self.logger.debug("Tag Read Error")
-                return False
-            elif rtncode == 0x33:
-                self.logger.debug("Tag Write Error")
-                return False
-            elif rtncode == 0x34:
-                self.logger.debug("Tag Lock Error")
-                return False
-            elif rtncode == 0x35:
-                self.logger.debug("Tag Kill Error")
-                return False
-            elif rtncode == 0x36:
-                self.logger.debug("No Tag Error")
-                return False
-            elif rtncode == 0x37:
-                self.logger.debug("Inventory Ok But Access Fail")
-                return False
-            elif rtncode == 0x38:
-                self.logger.debug("Buffer Is Empty Error")
-                return False
-            elif rtncode == 0x40:
-                self.logger.debug("Access Or Password Error")
-                return False
-            elif rtncode == 0x41:
-                self.logger.debug("Parameter Invalid")
-                return False
-            elif rtncode == 0x42:
-                self.logger.debug("Parameter Invalid WordCnt Too Long")
-                return False
-            elif rtncode == 0x43:
-                self.logger.debug("Parameter Invalid Membank Out Of Range")
-                return False
-            elif rtncode == 0x44:
-                self.logger.debug("Parameter Invalid Lock Region Out Of Range")
-                return False
-            elif rtncode == 0x45:
-                self.logger.debug("Parameter Invalid Lock Action Out Of Range")
-                return False
-            elif rtncode == 0x46:
-                self.logger.debug("Parameter Reader Address Invalid")
-                return False
-            elif rtncode == 0x47:
-                self.logger.debug("Parameter Invalid AntennaId Out Of Range")
-                return False
-            elif rtncode == 0x48:
-                self.logger.debug("Parameter Invalid Output Power Out Of Range")
-                return False
-            elif rtncode == 0x49:
-                self.logger.debug("Parameter Invalid Frequency Region Out Of Range")
-                return False
-            elif rtncode == 0x4A:
-                self.logger.debug("Parameter Invalid Baudrate Out Of Range")
-                return False
-            elif rtncode == 0x4B:
-                self.logger.debug("Parameter Beeper Mode Out Of Range")
-                return False
-            elif rtncode == 0x4C:
-                self.logger.debug("Parameter Epc Match Len Too Long")
-                return False
-            elif rtncode == 0x4D:
-                self.logger.debug("Parameter Epc Match Len Error")
-                return False
-            elif rtncode == 0x4E:
-                self.logger.debug("Parameter Invalid Epc Match Mode")
-                return False
-            elif rtncode == 0x4F:
-                self.logger.debug("Parameter Invalid Frequency Range")
-                return False
-            elif rtncode == 0x50:
-                self.logger.debug("Fail To Get RN16 From Tag")
-                return False
-            elif rtncode == 0x51:
-                self.logger.debug("Parameter Invalid Drm Mode")
-                return False
-            elif rtncode == 0x52:
-                self.logger.debug("Pll Lock Fail")
-                return False
-            elif rtncode == 0x53:
-                self.logger.debug("Rf Chip Fail To Response")
-                return False
-            elif rtncode == 0x54:
-                self.logger.debug("Fail To Achieve Desired Output Power")
-                return False
-            elif rtncode == 0x55:
-                self.logger.debug("Copyright Authentication Fail")
-                return False
-            elif rtncode == 0x56:
-                self.logger.debug("Spectrum Regulation Error")
-                return False
-            elif rtncode == 0x57:
-                self.logger.debug("Output Power Too Low")
-                return False
+        self.logger.debug(ReaderModule.ERROR_CODES.get(rtncode, "Unknown Error"))
+        return False
             
     """
     Turn on DO Port, [0] is Green, [1] is Red
@@ -1078,7 +1182,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.model.removeRows(0, self.model.rowCount())
         self.tableView.setModel(self.model)
         self.tableView_2.setModel(self.model2)
-        self.tags[:] = []
+        self.tagStore.clear()
         
     """
     Btn Start Inventory
@@ -1104,9 +1208,19 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def btn_reader_connect_click(self):
         self.set_digital_input()
         self.set_digital_output()
-        if not window.rs232.isConnect():
+        if not self.connection.isConnect():
             print ("Connecting...", end="")
-            self.rs232.connect()
+            try:
+                self.connection.connect()
+            except Exception as err:
+                print ("Failed")
+                self.logger.debug("Error: {0}".format(err))
+                self.lbAppStatus.setText("Connecting...Failed")
+                return
+            self.negotiate_baudrate()
+            if self.captureFile:
+                self.connection.startCapture(self.captureFile)
+            self.load_reader_state()
             self.lbConnectStatus.setText("Connected")
             self.lbConnectStatus.setStyleSheet("background-color:rgb(0, 170, 0)")
             self.disable_Connect_Group(False)
@@ -1119,12 +1233,68 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.monitorSignal.emit()
         else:
             self.gpio.btn_stop_click()
-            self.rs232.disConnect()
+            self.connection.stopCapture()
+            self.connection.disConnect()
             self.lbConnectStatus.setText("Disconnected")
             self.lbConnectStatus.setStyleSheet("background-color:rgb(255, 0, 0)")
             self.disable_Connect_Group(True)
         app.processEvents()
 
+    """
+    Move the serial link to the fastest baud rate the reader sustains,
+    the rate found is saved as [RS232] baudrate
+    """
+    def negotiate_baudrate(self):
+        if self.connection is not self.rs232 or self.configManager.get('RS232', 'negotiate', fallback='off') != 'on':
+            return
+        print ("Negotiate baudrate ... ", end="")
+        negotiator = BaudNegotiator.BaudNegotiator(self.rs232, self.reader)
+        try:
+            rate = negotiator.negotiate()
+        except Exception as err:
+            self.logger.debug("Error: {0}".format(err))
+            rate = None
+        if rate is None:
+            # Reader not found at any rate, keep the configured one
+            print ("Failed")
+            self.rs232.setBaudRate(int(self.cfgRS232Baudrate))
+            return
+        print (rate)
+        self.logger.debug("Baudrate: {0}".format(rate))
+        if str(rate) != self.cfgRS232Baudrate:
+            self.cfgRS232Baudrate = str(rate)
+            self.configManager.set('RS232', 'baudrate', str(rate))
+            BaudNegotiator.saveConfig(self.configManager)
+
+    """
+    Read the reader's settings once per connect, in one round of queries,
+    inventory_data then only sends the settings that differ
+    """
+    def load_reader_state(self):
+        self.curPower = [0,0,0,0]
+        self.curRegion = 0
+        self.curProfile = None
+        self.curSelect = False
+        if self.connection is not self.rs232 and self.connection is not self.socket:
+            return
+        state = ReaderState.ReaderState()
+        try:
+            state.query(self.connection, self.reader)
+        except Exception as err:
+            self.logger.debug("Error: {0}".format(err))
+            return
+        self.logger.debug(state.report())
+        if state.power is not None:
+            self.curPower = list(state.power)
+        if state.region is not None and state.region == self.reader.countryRegion(self.region):
+            self.curRegion = self.region
+        self.curProfile = state.profile
+        if state.masks is not None:
+            self.tagSelect.beginQuery()
+            for record in state.masks:
+                self.tagSelect.queryRecord(record)
+            self.curSelect = self.tagSelect.verify()
+
     """
     Connect to reader
     """
@@ -1,7 +1,8 @@
 class Messagetran:
-    def __init__(self, cmd, databarr):
+    def __init__(self, cmd, databarr, address=None):
         self.__cmd = cmd
         self.__databarr = databarr
+        self.__address = address
 
     @property
     def cmd(self):
@@ -10,3 +11,10 @@ class Messagetran:
     @property
     def databarr(self):
         return self.__databarr
+
+    """
+    Reader address byte of the frame, None when unknown
+    """
+    @property
+    def address(self):
+        return self.__address
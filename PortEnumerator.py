@@ -0,0 +1,121 @@
+# coding=UTF-8
+import os
+from collections import namedtuple
+
+"""
+Serial port found in sysfs
+vid / pid: USB vendor / product id (int) or None for on-board UARTs
+"""
+PortInfo = namedtuple('PortInfo', 'device name driver subsystem vid pid serialNumber manufacturer product')
+
+class PortEnumerator:
+    """
+    Serial ports from /sys/class/tty metadata, no device is opened.
+
+    A tty is a serial port when it has a device link (virtual consoles and
+    ptys do not). Legacy ttyS ports without a UART behind them report
+    type 0 (PORT_UNKNOWN) and are skipped. USB adapters (usb-serial,
+    cdc_acm) get VID / PID / serial number from the USB device directory.
+
+    The list is cached and built again only when /dev or /sys/class/tty
+    changed (udev adds and removes device nodes in /dev).
+    """
+    SYSFS_TTY = '/sys/class/tty'
+    WATCHED = ('/dev', SYSFS_TTY)
+
+    def __init__(self):
+        self.cache = None
+        self.stamp = None
+
+    def directoryStamp(self):
+        stamp = []
+        for path in self.WATCHED:
+            try:
+                status = os.stat(path)
+                stamp.append((status.st_mtime_ns, status.st_ino))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def ports(self):
+        stamp = self.directoryStamp()
+        if self.cache is None or stamp != self.stamp:
+            self.cache = self.scan()
+            self.stamp = stamp
+        return self.cache
+
+    def devices(self):
+        return [port.device for port in self.ports()]
+
+    """
+    Device of the USB adapter with this serial number, None when absent
+    """
+    def findBySerial(self, serialNumber):
+        for port in self.ports():
+            if port.serialNumber == serialNumber:
+                return port.device
+        return None
+
+    def scan(self):
+        try:
+            names = os.listdir(self.SYSFS_TTY)
+        except OSError:
+            return []
+        ports = []
+        for name in sorted(names):
+            port = self.portInfo(name)
+            if port is not None:
+                ports.append(port)
+        return ports
+
+    def portInfo(self, name):
+        ttyPath = os.path.join(self.SYSFS_TTY, name)
+        devicePath = os.path.join(ttyPath, 'device')
+        if not os.path.exists(devicePath):
+            return None
+        devicePath = os.path.realpath(devicePath)
+        subsystem = self.linkName(os.path.join(devicePath, 'subsystem'))
+        driver = self.linkName(os.path.join(devicePath, 'driver'))
+        if self.readAttribute(ttyPath, 'type') == '0':
+            return None
+        usbPath = None
+        if subsystem == 'usb-serial':
+            # ttyUSB: device is the usb-serial port, two levels below the USB device
+            usbPath = os.path.dirname(os.path.dirname(devicePath))
+        elif subsystem == 'usb':
+            # ttyACM: device is the USB interface
+            usbPath = os.path.dirname(devicePath)
+        vid = pid = serialNumber = manufacturer = product = None
+        if usbPath is not None:
+            vid = self.readHex(usbPath, 'idVendor')
+            pid = self.readHex(usbPath, 'idProduct')
+            serialNumber = self.readAttribute(usbPath, 'serial')
+            manufacturer = self.readAttribute(usbPath, 'manufacturer')
+            product = self.readAttribute(usbPath, 'product')
+        return PortInfo('/dev/' + name, name, driver, subsystem, vid, pid, serialNumber, manufacturer, product)
+
+    @staticmethod
+    def linkName(path):
+        if os.path.islink(path):
+            return os.path.basename(os.readlink(path))
+        return None
+
+    @staticmethod
+    def readAttribute(path, attribute):
+        try:
+            with open(os.path.join(path, attribute)) as attributeFile:
+                return attributeFile.read().strip()
+        except OSError:
+            return None
+
+    def readHex(self, path, attribute):
+        value = self.readAttribute(path, attribute)
+        return int(value, 16) if value else None
+
+# Shared cache for every caller in the process
+enumerator = PortEnumerator()
+
+if __name__ == '__main__':
+    for port in enumerator.ports():
+        usb = "{0:04X}:{1:04X} {2}".format(port.vid, port.pid, port.serialNumber) if port.vid is not None else ""
+        print ("{0:16} {1:14} {2:12} {3}".format(port.device, port.driver or "", port.subsystem or "", usb))
@@ -0,0 +1,62 @@
+# coding=UTF-8
+import time
+
+class ReadClock:
+    """
+    Read timestamps as time.monotonic_ns(), taken once per read.
+
+    The wall clock is sampled together with the monotonic clock (the
+    anchor), a timestamp becomes wall time by adding the anchor offset.
+    format() makes the display / storage string and builds it once per
+    second, reads in the same second share the cached string. When it
+    builds a new string it compares the wall clock with the anchor and
+    anchors again when they are more than DRIFT_NS apart (NTP stepped the
+    clock, the gate Pi has no RTC). Durations are differences of
+    timestamps, wall clock steps do not affect them.
+    """
+    FORMAT = '%Y/%m/%d %H:%M:%S'
+    DRIFT_NS = 500000000
+
+    def __init__(self):
+        self.anchor()
+
+    def anchor(self):
+        self.wallNs = time.time_ns()
+        self.monotonicNs = time.monotonic_ns()
+        self.cachedSecond = None
+        self.cachedText = ""
+
+    def now(self):
+        return time.monotonic_ns()
+
+    """
+    Wall clock seconds since the epoch of timestamp ns
+    """
+    def wall(self, ns):
+        return (self.wallNs + ns - self.monotonicNs) / 1e9
+
+    """
+    Anchor again when the wall clock was stepped, True when it was
+    """
+    def check(self):
+        drift = time.time_ns() - (self.wallNs + time.monotonic_ns() - self.monotonicNs)
+        if abs(drift) <= self.DRIFT_NS:
+            return False
+        self.anchor()
+        return True
+
+    def format(self, ns):
+        second = (self.wallNs + ns - self.monotonicNs) // 1000000000
+        if second != self.cachedSecond:
+            if self.check():
+                second = (self.wallNs + ns - self.monotonicNs) // 1000000000
+            self.cachedText = time.strftime(self.FORMAT, time.localtime(second))
+            self.cachedSecond = second
+        return self.cachedText
+
+    """
+    Seconds from timestamp start to timestamp end
+    """
+    @staticmethod
+    def seconds(start, end):
+        return (end - start) / 1e9
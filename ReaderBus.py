@@ -0,0 +1,240 @@
+# coding=UTF-8
+import threading
+import time
+from collections import deque
+
+import FrameDecoder
+import ReaderModule
+
+class BusReader:
+    """
+    One reader on a link: its own ReaderModule (address, frame cache,
+    pending requests) and its own stream of response frames.
+
+    handler(busReader, msgTran) is called from the link's receive thread,
+    without a handler the frames are queued in frames.
+    """
+    def __init__(self, connection, address, handler=None):
+        self.connection = connection
+        self.address = address
+        self.reader = ReaderModule.ReaderModule(address)
+        self.handler = handler
+        self.frames = deque()
+        self.roundCmd = None
+        self.roundDone = threading.Event()
+        self.roundStart = 0.0
+        self.roundEnd = 0.0
+        self.rounds = 0
+        self.timeouts = 0
+        self.roundTime = 0.0
+
+class ReaderBus:
+    """
+    Several readers on one RS-485 bus and / or on several serial / TCP links.
+
+    Every link has one FrameDecoder, frames are routed to their reader by
+    the address byte. Only one reader per link runs an inventory round at a
+    time (the readers share the line), the links run their rounds in
+    parallel, and each link moves on to its next reader as soon as the
+    round's total count arrives. Aggregate throughput grows with the number
+    of links, and a bus carries no idle time between readers.
+    """
+    # Responses that end an inventory round
+    ROUND_END = (ReaderModule.ErrorRecord, ReaderModule.TotalCountRecord,
+                 ReaderModule.FastSwitchTotalRecord, ReaderModule.BufferInventoryRecord)
+
+    def __init__(self, roundTimeout=1.0):
+        self.roundTimeout = roundTimeout
+        self.decoders = {}
+        self.readers = {}
+        self.rotation = {}
+        self.unroutedFrames = 0
+        self.checksumErrors = 0
+
+    def addReader(self, connection, address, handler=None):
+        busReader = BusReader(connection, address, handler)
+        if connection not in self.decoders:
+            self.decoders[connection] = FrameDecoder.FrameDecoder()
+            self.rotation[connection] = deque()
+        self.readers[(connection, address)] = busReader
+        self.rotation[connection].append(busReader)
+        return busReader
+
+    def links(self):
+        return list(self.decoders)
+
+    """
+    Decode data received on connection and route the frames
+    """
+    def feed(self, connection, data):
+        for msgTran in self.decoders[connection].decode(data):
+            self.route(connection, msgTran)
+
+    def route(self, connection, msgTran):
+        if msgTran.cmd == 0x00:
+            self.checksumErrors += 1
+            return
+        busReader = self.readers.get((connection, msgTran.address))
+        if busReader is None:
+            self.unroutedFrames += 1
+            return
+        busReader.reader.resolveResponse(msgTran)
+        if msgTran.cmd == busReader.roundCmd and not busReader.roundDone.is_set():
+            if isinstance(busReader.reader.parseResponse(msgTran.cmd, msgTran.databarr), self.ROUND_END):
+                busReader.roundEnd = time.monotonic()
+                busReader.roundDone.set()
+        if busReader.handler is not None:
+            busReader.handler(busReader, msgTran)
+        else:
+            busReader.frames.append(msgTran)
+
+    """
+    Receive loop of one link, run it in its own thread
+    running: callable, the loop ends when it returns False
+    """
+    def receive(self, connection, running):
+        while running():
+            data = connection.serRead()
+            if data:
+                self.feed(connection, data)
+
+    def startReceive(self, running):
+        threads = []
+        for connection in self.links():
+            thread = threading.Thread(target=self.receive, args=(connection, running))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    """
+    One inventory round on the next reader of every link.
+    frameFactory(reader) returns the round's command frame.
+    Return the readers that ran.
+    """
+    def pollRound(self, frameFactory):
+        started = []
+        for connection in self.links():
+            rotation = self.rotation[connection]
+            busReader = rotation[0]
+            rotation.rotate(-1)
+            frame = frameFactory(busReader.reader)
+            busReader.roundCmd = frame[3]
+            busReader.roundDone.clear()
+            busReader.roundStart = time.monotonic()
+            connection.serWrite(frame)
+            started.append(busReader)
+        for busReader in started:
+            remaining = busReader.roundStart + self.roundTimeout - time.monotonic()
+            if busReader.roundDone.wait(max(remaining, 0)):
+                busReader.rounds += 1
+            else:
+                busReader.timeouts += 1
+                busReader.roundEnd = time.monotonic()
+            busReader.roundTime += busReader.roundEnd - busReader.roundStart
+            busReader.roundCmd = None
+        return started
+
+    def report(self):
+        lines = []
+        for (connection, address), busReader in self.readers.items():
+            rounds = busReader.rounds + busReader.timeouts
+            lines.append("Reader 0x{0:02X}: rounds {1}, timeouts {2}, round {3:.1f}ms".format(
+                address, rounds, busReader.timeouts, busReader.roundTime / rounds * 1000 if rounds else 0.0))
+        lines.append("Unrouted frames {0}, checksum errors {1}".format(self.unroutedFrames, self.checksumErrors))
+        return lines
+
+
+"""
+Throughput check against ReaderEmulator
+usage: python ReaderBus.py [readers] [seconds] [tags]
+
+Runs the same inventory twice, readers emulated readers each time:
+all of them on one shared link (RS-485 style, addresses 1 ~ readers),
+then one link each, and prints rounds and tag reads per second.
+The gate apps (Main, ReaderToolMain) still drive one reader.
+"""
+class SharedLine:
+    """
+    Several emulators behind one link, each answers its own address
+    """
+    def __init__(self, emulators):
+        self.emulators = emulators
+        self.random = emulators[0].random
+
+    def handle(self, msgTran, emit):
+        for emulator in self.emulators:
+            emulator.handle(msgTran, emit)
+
+def serveEmulator(emulator):
+    import socket
+    import ReaderEmulator
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def serve():
+        client, peer = server.accept()
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        ReaderEmulator.EmulatorLink(emulator).serve(lambda: client.recv(4096), client.sendall)
+        client.close()
+
+    thread = threading.Thread(target=serve)
+    thread.daemon = True
+    thread.start()
+    return server.getsockname()[1]
+
+def run(lines, seconds):
+    import SocketModule
+    bus = ReaderBus()
+    reads = [0]
+    tags = set()
+
+    def handler(busReader, msgTran):
+        if msgTran.cmd == busReader.reader.cmd_realtimeInventory:
+            record = busReader.reader.parseInventory(msgTran.databarr)
+            if type(record) is ReaderModule.InventoryRecord:
+                reads[0] += 1
+                tags.add((busReader.address, record.epc))
+
+    connections = []
+    for line, addresses in lines:
+        connection = SocketModule.SocketModule('127.0.0.1', serveEmulator(line))
+        connection.connect()
+        connections.append(connection)
+        for address in addresses:
+            bus.addReader(connection, address, handler)
+    running = [True]
+    threads = bus.startReceive(lambda: running[0])
+    rounds = 0
+    begin = time.monotonic()
+    while time.monotonic() - begin < seconds:
+        rounds += len(bus.pollRound(lambda reader: reader.realtimeInventory(reader.realtimeInventoryRepeat)))
+    elapsed = time.monotonic() - begin
+    running[0] = False
+    for thread in threads:
+        thread.join()
+    for connection in connections:
+        connection.disConnect()
+    return rounds / elapsed, reads[0] / elapsed, len(tags), bus.report()
+
+if __name__ == '__main__':
+    import sys
+    import ReaderEmulator
+    readerCount = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    tagCount = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    def emulators():
+        return [ReaderEmulator.ReaderEmulator(ReaderEmulator.TagPopulation(tagCount, seed=address), address, seed=address)
+                for address in range(1, readerCount + 1)]
+
+    addresses = list(range(1, readerCount + 1))
+    shared = emulators()
+    results = [("1 link, {0} readers".format(readerCount), run([(SharedLine(shared), addresses)], seconds))]
+    results.append(("{0} links, 1 reader each".format(readerCount),
+                    run([(emulator, [emulator.address]) for emulator in emulators()], seconds)))
+    for name, (roundRate, readRate, tagTotal, report) in results:
+        print ("{0}: {1:.1f} rounds/s, {2:.0f} reads/s, {3} tags".format(name, roundRate, readRate, tagTotal))
+        for line in report:
+            print ("  " + line)
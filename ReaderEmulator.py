@@ -0,0 +1,506 @@
+# coding=UTF-8
+import argparse
+import os
+import queue
+import random
+import socket
+import struct
+import threading
+import time
+
+import FrameDecoder
+import ReaderModule
+
+class EmulatedTag:
+    """
+    Tag memory: 0x00 reserved, 0x01 EPC (CRC PC EPC), 0x02 TID, 0x03 USER
+    rssi / probabilities: per antenna (0 ~ 3), dBm and read probability per round
+    """
+    def __init__(self, epc, tid, rssi, probabilities):
+        pc = (len(epc) // 2) << 11
+        self.banks = {
+            0x00: bytearray(8),
+            0x01: bytearray(2) + bytearray(pc.to_bytes(2, 'big')) + bytearray(epc),
+            0x02: bytearray(tid),
+            0x03: bytearray(32),
+        }
+        self.rssi = rssi
+        self.probabilities = probabilities
+        self.flags = [0x00, 0x00, 0x00, 0x00]
+        self.selected = True
+
+    @property
+    def pc(self):
+        return int.from_bytes(self.banks[0x01][2:4], 'big')
+
+    @property
+    def epc(self):
+        return bytes(self.banks[0x01][4:4 + ((self.pc >> 11) << 1)])
+
+    def pcEpc(self):
+        return bytes(self.banks[0x01][2:4]) + self.epc
+
+    def matches(self, membank, startAddress, maskLen, mask):
+        data = self.banks.get(membank, b'')
+        dataBits = len(data) * 8
+        if startAddress + maskLen > dataBits or maskLen == 0:
+            return maskLen == 0
+        value = int.from_bytes(data, 'big') >> (dataBits - startAddress - maskLen)
+        value &= (1 << maskLen) - 1
+        return value == int.from_bytes(mask, 'big') >> (len(mask) * 8 - maskLen)
+
+class TagPopulation:
+    """
+    count tags with random EPC / TID, weakRatio of them seen by one
+    antenna only and weakly, the others by every antenna
+    """
+    def __init__(self, count, antennaCount=4, weakRatio=0.2, seed=None):
+        rand = random.Random(seed)
+        self.tags = []
+        for i in range(count):
+            epc = bytes([0xE2, 0x80]) + rand.getrandbits(80).to_bytes(10, 'big')
+            tid = bytes([0xE2, 0x80, 0x11, 0x60]) + rand.getrandbits(64).to_bytes(8, 'big')
+            if rand.random() < weakRatio:
+                antenna = rand.randrange(antennaCount)
+                rssi = [-90] * antennaCount
+                rssi[antenna] = rand.randint(-78, -70)
+                probabilities = [0.0] * antennaCount
+                probabilities[antenna] = rand.uniform(0.05, 0.3)
+            else:
+                rssi = [rand.randint(-65, -40) for a in range(antennaCount)]
+                probabilities = [rand.uniform(0.7, 1.0) for a in range(antennaCount)]
+            self.tags.append(EmulatedTag(epc, tid, rssi, probabilities))
+
+class ReaderEmulator:
+    """
+    Reader side of the 0xA0 protocol.
+
+    handle() takes one decoded command and calls emit(frame) for every
+    response frame, inventory rounds take roundTime seconds of RF time
+    each. Repeat 0xFF (the apps' default) runs one round.
+    """
+    SUCCESS = 0x10
+    COMMAND_FAIL = 0x11
+    NO_TAG = 0x36
+    PARAMETER_INVALID = 0x41
+
+    def __init__(self, population, address=0x01, roundTime=0.02, seed=None):
+        self.population = population
+        self.address = address
+        self.roundTime = roundTime
+        self.random = random.Random(seed)
+        self.encoder = ReaderModule.ReaderModule(address)
+        self.workingAntenna = 0x00
+        self.powers = [30, 30, 30, 30]
+        self.region = (0x01, 0x29, 0x30)
+        self.profile = 0xD0
+        self.masks = {}
+        self.inventoryBuffer = {}
+        self.handlers = {
+            0x71: self.handleAck,
+            0x72: self.handleFirmwareVersion,
+            0x74: self.handleSetWorkingAntenna,
+            0x75: self.handleGetWorkingAntenna,
+            0x76: self.handleSetOutputPower,
+            0x77: self.handleGetOutputPower,
+            0x66: self.handleSetTemporaryOutputPower,
+            0x69: self.handleSetRfLinkProfile,
+            0x6A: self.handleGetRfLinkProfile,
+            0x78: self.handleSetFrequencyRegion,
+            0x79: self.handleGetFrequencyRegion,
+            0x7B: self.handleTemperature,
+            0x81: self.handleRead,
+            0x82: self.handleWrite,
+            0x80: self.handleBufferInventory,
+            0x89: self.handleRealtimeInventory,
+            0x8A: self.handleFastSwitchInventory,
+            0x8B: self.handleSessionTargetInventory,
+            0x90: self.handleGetInventoryBuffer,
+            0x91: self.handleGetInventoryBuffer,
+            0x92: self.handleGetInventoryBufferTagCount,
+            0x93: self.handleResetInventoryBuffer,
+            0x98: self.handleTagSelect,
+        }
+
+    def frame(self, cmd, databarr):
+        return self.encoder.buildCmd(cmd, databarr)
+
+    def handle(self, msgTran, emit):
+        if msgTran.address != self.address and msgTran.address != 0xFF:
+            return
+        handler = self.handlers.get(msgTran.cmd)
+        if handler is None:
+            emit(self.frame(msgTran.cmd, (self.COMMAND_FAIL,)))
+            return
+        try:
+            handler(msgTran.cmd, msgTran.databarr, emit)
+        except (IndexError, ValueError, struct.error):
+            emit(self.frame(msgTran.cmd, (self.PARAMETER_INVALID,)))
+
+    def handleAck(self, cmd, databarr, emit):
+        emit(self.frame(cmd, (self.SUCCESS,)))
+
+    def handleFirmwareVersion(self, cmd, databarr, emit):
+        emit(self.frame(cmd, (0x01, 0x08)))
+
+    def handleSetWorkingAntenna(self, cmd, databarr, emit):
+        if databarr[0] > 0x03:
+            emit(self.frame(cmd, (0x47,)))
+            return
+        self.workingAntenna = databarr[0]
+        emit(self.frame(cmd, (self.SUCCESS,)))
+
+    def handleGetWorkingAntenna(self, cmd, databarr, emit):
+        emit(self.frame(cmd, (self.workingAntenna,)))
+
+    def handleSetOutputPower(self, cmd, databarr, emit):
+        self.powers = list(databarr) * 4 if len(databarr) == 1 else list(databarr[0:4])
+        emit(self.frame(cmd, (self.SUCCESS,)))
+
+    def handleGetOutputPower(self, cmd, databarr, emit):
+        emit(self.frame(cmd, tuple(self.powers)))
+
+    def handleSetTemporaryOutputPower(self, cmd, databarr, emit):
+        self.powers = [databarr[0]] * 4
+        emit(self.frame(cmd, (self.SUCCESS,)))
+
+    def handleSetFrequencyRegion(self, cmd, databarr, emit):
+        self.region = tuple(databarr)
+        emit(self.frame(cmd, (self.SUCCESS,)))
+
+    def handleGetFrequencyRegion(self, cmd, databarr, emit):
+        emit(self.frame(cmd, self.region))
+
+    def handleSetRfLinkProfile(self, cmd, databarr, emit):
+        if databarr[0] not in (0xD0, 0xD1, 0xD2, 0xD3):
+            emit(self.frame(cmd, (self.PARAMETER_INVALID,)))
+            return
+        self.profile = databarr[0]
+        emit(self.frame(cmd, (self.SUCCESS,)))
+
+    def handleGetRfLinkProfile(self, cmd, databarr, emit):
+        emit(self.frame(cmd, (self.profile,)))
+
+    def handleTemperature(self, cmd, databarr, emit):
+        emit(self.frame(cmd, (0x01, self.random.randint(34, 38))))
+
+    def handleResetInventoryBuffer(self, cmd, databarr, emit):
+        self.inventoryBuffer = {}
+        emit(self.frame(cmd, (self.SUCCESS,)))
+
+    """
+    0x98: set MaskNo Target Action Membank StartAdd MaskLen Mask Truncate,
+    clear MaskNo (0x00 every mask), query 0x20
+    """
+    def handleTagSelect(self, cmd, databarr, emit):
+        if len(databarr) == 1 and databarr[0] == 0x20:
+            if not self.masks:
+                emit(self.frame(cmd, (self.SUCCESS,)))
+            for maskNo in sorted(self.masks):
+                emit(self.frame(cmd, bytes([maskNo, len(self.masks)]) + self.masks[maskNo]))
+            return
+        if len(databarr) == 1:
+            if databarr[0] == 0x00:
+                self.masks = {}
+            else:
+                self.masks.pop(databarr[0], None)
+            emit(self.frame(cmd, (self.SUCCESS,)))
+            return
+        maskLen = databarr[5]
+        maskEnd = 6 + (maskLen + 7) // 8
+        if not 1 <= databarr[0] <= 5 or len(databarr) < maskEnd + 1:
+            emit(self.frame(cmd, (self.PARAMETER_INVALID,)))
+            return
+        self.masks[databarr[0]] = bytes(databarr[1:maskEnd + 1])
+        emit(self.frame(cmd, (self.SUCCESS,)))
+
+    """
+    SL flag of every tag from the masks, in mask order
+    """
+    def applySelect(self):
+        tags = self.population.tags
+        for tag in tags:
+            tag.selected = True
+        for maskNo in sorted(self.masks):
+            mask = self.masks[maskNo]
+            action, membank, startAddress, maskLen = mask[1], mask[2], mask[3], mask[4]
+            value = mask[5:5 + (maskLen + 7) // 8]
+            for tag in tags:
+                match = tag.matches(membank, startAddress, maskLen, value)
+                if action == 0x00:
+                    tag.selected = match
+                elif action == 0x01 and match:
+                    tag.selected = True
+                elif action == 0x04 and not match:
+                    tag.selected = False
+
+    def inventoryRound(self, session, target):
+        antenna = self.workingAntenna
+        reads = []
+        for tag in self.population.tags:
+            if not tag.selected:
+                continue
+            if session != 0x00 and tag.flags[session] != target:
+                continue
+            if self.random.random() < tag.probabilities[antenna]:
+                reads.append(tag)
+                if session != 0x00:
+                    tag.flags[session] ^= 0x01
+        return reads
+
+    def readRssi(self, tag, antenna):
+        return tag.rssi[antenna] + self.random.randint(-2, 2)
+
+    def freqAnt(self, antenna):
+        return (self.random.randrange(50) << 2) | (antenna & 0x03)
+
+    """
+    Run the rounds on the working antenna, onTag(tag) for every read,
+    returns (total reads, elapsed seconds)
+    """
+    def runRounds(self, session, target, repeat, onTag):
+        self.applySelect()
+        rounds = 1 if repeat in (0x00, 0xFF) else repeat
+        begin = time.monotonic()
+        totalRead = 0
+        for i in range(rounds):
+            time.sleep(self.roundTime)
+            for tag in self.inventoryRound(session, target):
+                onTag(tag)
+                totalRead += 1
+        return totalRead, max(time.monotonic() - begin, 0.001)
+
+    def runInventory(self, cmd, session, target, repeat, emit):
+        if self.powers[self.workingAntenna] == 0:
+            emit(self.frame(cmd, (0x22,)))
+            return
+        antenna = self.workingAntenna
+        def onTag(tag):
+            rssi = (self.readRssi(tag, antenna) + 129) & 0x7F
+            emit(self.frame(cmd, bytes([self.freqAnt(antenna)]) + tag.pcEpc() + bytes([rssi])))
+        totalRead, elapsed = self.runRounds(session, target, repeat, onTag)
+        readRate = min(int(totalRead / elapsed), 0xFFFF)
+        emit(self.frame(cmd, struct.pack('>BHI', antenna, readRate, totalRead)))
+
+    def handleRealtimeInventory(self, cmd, databarr, emit):
+        self.runInventory(cmd, 0x00, 0x00, databarr[0] if databarr else 0x01, emit)
+
+    def handleSessionTargetInventory(self, cmd, databarr, emit):
+        self.runInventory(cmd, databarr[0] & 0x03, databarr[1] & 0x01, databarr[2] if len(databarr) > 2 else 0x01, emit)
+
+    """
+    0x8A: (AntId Stay) * 4, Interval, Repeat, unused antenna slots are 0xFF
+    """
+    def handleFastSwitchInventory(self, cmd, databarr, emit):
+        begin = time.monotonic()
+        totalRead = 0
+        workingAntenna = self.workingAntenna
+        for cycle in range(max(databarr[9], 1)):
+            for slot in range(4):
+                antenna, stay = databarr[slot * 2], databarr[slot * 2 + 1]
+                if antenna == 0xFF:
+                    continue
+                if antenna > 0x03:
+                    emit(self.frame(cmd, (antenna, 0x22)))
+                    continue
+                self.workingAntenna = antenna
+                def onTag(tag):
+                    rssi = (self.readRssi(tag, antenna) + 129) & 0x7F
+                    emit(self.frame(cmd, bytes([self.freqAnt(antenna)]) + tag.pcEpc() + bytes([rssi])))
+                totalRead += self.runRounds(0x00, 0x00, max(stay, 1), onTag)[0]
+                time.sleep(databarr[8] / 1000.0)
+        self.workingAntenna = workingAntenna
+        duration = int((time.monotonic() - begin) * 1000)
+        emit(self.frame(cmd, totalRead.to_bytes(3, 'big') + duration.to_bytes(4, 'big')))
+
+    """
+    0x80: Repeat, unique tags are kept in the inventory buffer
+    """
+    def handleBufferInventory(self, cmd, databarr, emit):
+        antenna = self.workingAntenna
+        def onTag(tag):
+            rssi = self.readRssi(tag, antenna)
+            entry = self.inventoryBuffer.get(tag.epc)
+            if entry is None:
+                self.inventoryBuffer[tag.epc] = [tag, rssi, antenna, 1]
+            else:
+                entry[1] = max(entry[1], rssi)
+                entry[2] = antenna
+                entry[3] = min(entry[3] + 1, 0xFF)
+        totalRead, elapsed = self.runRounds(0x00, 0x00, databarr[0], onTag)
+        readRate = min(int(totalRead / elapsed), 0xFFFF)
+        emit(self.frame(cmd, struct.pack('>BHHI', antenna, len(self.inventoryBuffer), readRate, totalRead)))
+
+    """
+    0x90 / 0x91: TagCount(2) DataLen(1) PC(2) EPC(N) CRC(2) RSSI(1) FreqAnt(1) InvCount(1)
+    """
+    def handleGetInventoryBuffer(self, cmd, databarr, emit):
+        if not self.inventoryBuffer:
+            emit(self.frame(cmd, (self.NO_TAG,)))
+            return
+        tagCount = len(self.inventoryBuffer)
+        for tag, rssi, antenna, count in self.inventoryBuffer.values():
+            pcEpc = tag.pcEpc()
+            emit(self.frame(cmd, struct.pack('>HB', tagCount, len(pcEpc) + 2) + pcEpc + bytes(tag.banks[0x01][0:2])
+                            + bytes([(rssi + 129) & 0x7F, self.freqAnt(antenna), count])))
+        if cmd == 0x91:
+            self.inventoryBuffer = {}
+
+    def handleGetInventoryBufferTagCount(self, cmd, databarr, emit):
+        emit(self.frame(cmd, struct.pack('>H', len(self.inventoryBuffer))))
+
+    """
+    Access: one round on the working antenna, one response per tag read
+    TagCount(2) DataLen(1) PC(2) EPC(N) CRC(2) Data ... AntId(1) Count(1)
+    """
+    def accessTags(self, cmd, emit):
+        tags = []
+        self.runRounds(0x00, 0x00, 0x01, tags.append)
+        if not tags:
+            emit(self.frame(cmd, (self.NO_TAG,)))
+        return tags
+
+    def accessFrame(self, cmd, tagCount, tag, data, tail):
+        pcEpc = tag.pcEpc()
+        databarr = struct.pack('>HB', tagCount, len(pcEpc) + 2 + len(data)) + pcEpc + bytes(tag.banks[0x01][0:2]) + data
+        antenna = self.workingAntenna & 0x03
+        return self.frame(cmd, databarr + tail + bytes([antenna, 0x01]))
+
+    """
+    0x81: MemBank WordAdd WordCnt [Password(4)], or the multi bank form
+    ResAdd ResLen TidAdd TidLen UserAdd UserLen Password(4) Session Target Mode Timeout
+    """
+    def handleRead(self, cmd, databarr, emit):
+        if len(databarr) >= 14:
+            areas = [(0x00, databarr[0], databarr[1]), (0x02, databarr[2], databarr[3]), (0x03, databarr[4], databarr[5])]
+        else:
+            areas = [(databarr[0], databarr[1], databarr[2])]
+        tags = self.accessTags(cmd, emit)
+        for tag in tags:
+            data = b''
+            for membank, wordAdd, wordCnt in areas:
+                if wordCnt:
+                    data += bytes(tag.banks[membank][wordAdd * 2:(wordAdd + wordCnt) * 2])
+            emit(self.accessFrame(cmd, len(tags), tag, data, bytes([len(data)])))
+
+    """
+    0x82: Password(4) MemBank WordAdd WordCnt Data(WordCnt * 2)
+    """
+    def handleWrite(self, cmd, databarr, emit):
+        membank, wordAdd, wordCnt = databarr[4], databarr[5], databarr[6]
+        data = bytes(databarr[7:7 + wordCnt * 2])
+        if len(data) != wordCnt * 2 or membank not in (0x00, 0x01, 0x03):
+            emit(self.frame(cmd, (self.PARAMETER_INVALID,)))
+            return
+        tags = self.accessTags(cmd, emit)
+        for tag in tags:
+            bank = tag.banks[membank]
+            end = (wordAdd + wordCnt) * 2
+            if len(bank) < end:
+                bank.extend(bytearray(end - len(bank)))
+            bank[wordAdd * 2:end] = data
+            emit(self.accessFrame(cmd, len(tags), tag, b'', bytes([self.SUCCESS])))
+
+class EmulatorLink:
+    """
+    Byte link to the application: commands are decoded and handled in
+    one thread, responses leave through a sender thread limited to
+    baudrate / 10 bytes per second. errorRate is the share of response
+    frames sent with a wrong checksum.
+    """
+    def __init__(self, emulator, baudrate=115200, errorRate=0.0):
+        self.emulator = emulator
+        self.bytesPerSecond = baudrate / 10.0 if baudrate else 0
+        self.errorRate = errorRate
+        self.outbound = queue.Queue()
+        self.framesSent = 0
+        self.errorsInjected = 0
+
+    def emit(self, frame):
+        if self.errorRate and self.emulator.random.random() < self.errorRate:
+            frame = frame[:-1] + bytes([frame[-1] ^ 0x5A])
+            self.errorsInjected += 1
+        self.framesSent += 1
+        self.outbound.put(frame)
+
+    def sendLoop(self, write):
+        while True:
+            frame = self.outbound.get()
+            if frame is None:
+                break
+            try:
+                write(frame)
+            except OSError:
+                break
+            if self.bytesPerSecond:
+                time.sleep(len(frame) / self.bytesPerSecond)
+
+    """
+    read() returns received bytes, b'' when the peer is gone
+    """
+    def serve(self, read, write):
+        decoder = FrameDecoder.FrameDecoder()
+        sender = threading.Thread(target=self.sendLoop, args=(write,))
+        sender.daemon = True
+        sender.start()
+        while True:
+            try:
+                data = read()
+            except OSError:
+                break
+            if not data:
+                break
+            for msgTran in decoder.decode(data):
+                if msgTran.cmd != 0x00:
+                    self.emulator.handle(msgTran, self.emit)
+        self.outbound.put(None)
+        sender.join()
+
+    def servePty(self):
+        import tty
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        print ("Reader emulator on {0}".format(os.ttyname(slave)))
+        while True:
+            # Runs until killed, the slave stays open so the app can reconnect
+            self.serve(lambda: os.read(master, 4096), lambda data: os.write(master, data))
+
+    def serveTcp(self, host, port):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((host, port))
+        server.listen(1)
+        print ("Reader emulator on {0}:{1}".format(host, server.getsockname()[1]))
+        while True:
+            client, peer = server.accept()
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.serve(lambda: client.recv(4096), client.sendall)
+            client.close()
+            print ("{0}: {1} frames sent, {2} checksum errors injected".format(peer, self.framesSent, self.errorsInjected))
+
+"""
+usage: python ReaderEmulator.py [--pty | --tcp PORT] [--tags N] [--baudrate B] [--errors RATE]
+Point [RS232] serialport at the printed pty, or [Network] ip / port at the
+TCP port with [Mode] mode = 1, and run Main or ReaderToolMain as usual.
+"""
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="0xA0 protocol reader emulator")
+    parser.add_argument('--pty', action='store_true', help="serve on a pseudo-terminal (default)")
+    parser.add_argument('--tcp', type=int, metavar='PORT', help="serve on a TCP port")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--address', type=lambda value: int(value, 0), default=0x01)
+    parser.add_argument('--tags', type=int, default=100)
+    parser.add_argument('--weak', type=float, default=0.2, help="share of weak single-antenna tags")
+    parser.add_argument('--round', type=float, default=0.02, help="RF time per inventory round (s)")
+    parser.add_argument('--baudrate', type=int, default=115200, help="0 for no bandwidth limit")
+    parser.add_argument('--errors', type=float, default=0.0, help="share of frames with a bad checksum")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    population = TagPopulation(args.tags, weakRatio=args.weak, seed=args.seed)
+    emulator = ReaderEmulator(population, args.address, args.round, args.seed)
+    link = EmulatorLink(emulator, args.baudrate, args.errors)
+    if args.tcp is not None:
+        link.serveTcp(args.host, args.tcp)
+    else:
+        link.servePty()
@@ -1,14 +1,115 @@
 # coding=UTF-8
 import SocketModule
 import MessageTran
+import FrameDecoder
+import LatencyHistogram
 import random
+import struct
+import threading
+import time
+from collections import namedtuple, deque
+from concurrent.futures import Future
+
+"""
+Typed response records
+antenna: 1 ~ 8, rssi: dBm, pc: int, epc: bytes without PC
+"""
+ErrorRecord = namedtuple('ErrorRecord', 'code')
+InventoryRecord = namedtuple('InventoryRecord', 'antenna pc epc rssi')
+TotalCountRecord = namedtuple('TotalCountRecord', 'antenna readRate count')
+FastSwitchTotalRecord = namedtuple('FastSwitchTotalRecord', 'count duration')
+AntennaErrorRecord = namedtuple('AntennaErrorRecord', 'antenna code')
+BufferInventoryRecord = namedtuple('BufferInventoryRecord', 'antenna tagCount readRate count')
+BufferTagRecord = namedtuple('BufferTagRecord', 'tagCount antenna pc epc rssi readCount')
+ReadTagRecord = namedtuple('ReadTagRecord', 'antenna pc epc data readCount')
+TemperatureRecord = namedtuple('TemperatureRecord', 'temperature')
+OutputPowerRecord = namedtuple('OutputPowerRecord', 'powers')
+TagMaskRecord = namedtuple('TagMaskRecord', 'maskNo maskCount target action membank startAddress maskLen mask truncate')
+
+TOTAL_COUNT = struct.Struct('>BHI')
+PC = struct.Struct('>H')
+BUFFER_INVENTORY = struct.Struct('>BHHI')
+
+"""
+Reader return codes, 0x10 is success
+"""
+SUCCESS = 0x10
+ERROR_CODES = {
+    0x11: "Command Fail",
+    0x20: "MCU Reset Error",
+    0x21: "CW On Error",
+    0x22: "Antenna Mission Error",
+    0x23: "Write Flash Error",
+    0x24: "Read Flash Error",
+    0x25: "Set Output Power Error",
+    0x31: "Tag Inventory Error",
+    0x32: "Tag Read Error",
+    0x33: "Tag Write Error",
+    0x34: "Tag Lock Error",
+    0x35: "Tag Kill Error",
+    0x36: "No Tag Error",
+    0x37: "Inventory Ok But Access Fail",
+    0x38: "Buffer Is Empty Error",
+    0x40: "Access Or Password Error",
+    0x41: "Parameter Invalid",
+    0x42: "Parameter Invalid WordCnt Too Long",
+    0x43: "Parameter Invalid Membank Out Of Range",
+    0x44: "Parameter Invalid Lock Region Out Of Range",
+    0x45: "Parameter Invalid Lock Action Out Of Range",
+    0x46: "Parameter Reader Address Invalid",
+    0x47: "Parameter Invalid AntennaId Out Of Range",
+    0x48: "Parameter Invalid Output Power Out Of Range",
+    0x49: "Parameter Invalid Frequency Region Out Of Range",
+    0x4A: "Parameter Invalid Baudrate Out Of Range",
+    0x4B: "Parameter Beeper Mode Out Of Range",
+    0x4C: "Parameter Epc Match Len Too Long",
+    0x4D: "Parameter Epc Match Len Error",
+    0x4E: "Parameter Invalid Epc Match Mode",
+    0x4F: "Parameter Invalid Frequency Range",
+    0x50: "Fail To Get RN16 From Tag",
+    0x51: "Parameter Invalid Drm Mode",
+    0x52: "Pll Lock Fail",
+    0x53: "Rf Chip Fail To Response",
+    0x54: "Fail To Achieve Desired Output Power",
+    0x55: "Copyright Authentication Fail",
+    0x56: "Spectrum Regulation Error",
+    0x57: "Output Power Too Low",
+}
+
+class ReaderError(Exception):
+    def __init__(self, code):
+        self.code = code
+        self.message = ERROR_CODES.get(code, "Unknown Error")
+        Exception.__init__(self, "{0} (0x{1:02X})".format(self.message, code))
+
+"""
+Request waiting for its response, see ReaderModule.request
+"""
+class PendingRequest:
+    def __init__(self, connection, frame, timeout, retries):
+        self.future = Future()
+        self.connection = connection
+        self.frame = frame
+        self.cmd = frame[3]
+        self.timeout = timeout
+        self.retries = retries
+        self.timer = None
+        self.attempt = 0
+        self.sentTime = 0.0
 
 class ReaderModule:
-    def __init__(self):
+    """
+    readId: reader address, 0x01 ~ 0xFE, 0xFF is broadcast
+    """
+    def __init__(self, readId=0x01):
         
         self.btAryBuffer = bytearray()
+        self.decoder = FrameDecoder.FrameDecoder()
+
+        # Encoded frames of fixed argument commands, see getCmdWithData
+        self.frameCache = {}
         
-        self.readId = 0x01
+        self.readId = readId
 
         self.baudrate_38400 = 0x03
         self.baudrate_115200 = 0x04
@@ -62,6 +163,7 @@ class ReaderModule:
         self.cmd_getRfPortReturnLoss = 0x7E
 
         self.realtimeInventoryRepeat = 0xFF
+        self.cmd_inventory = 0x80
         self.cmd_read = 0x81
         self.cmd_write = 0x82
         self.cmd_read_type_default = 0x01
@@ -69,11 +171,65 @@ class ReaderModule:
         self.cmd_read_type_tid = 0x02
         self.cmd_read_type_user = 0x03
         self.cmd_realtimeInventory = 0x89
+        self.cmd_fastSwitchInventory = 0x8A
         self.cmd_customizedSessionTargetInventory = 0x8B
         self.cmd_tag_select = 0x98
 
+        self.cmd_get_inventory_buffer = 0x90
+        self.cmd_get_and_reset_inventory_buffer = 0x91
+        self.cmd_get_inventory_buffer_tag_count = 0x92
         self.cmd_reset_inventory_buffer = 0x93
 
+        # Commands whose arguments come from config, frames are cached
+        self.cachedCommands = frozenset([
+            self.cmd_setUartBaudrate,
+            self.cmd_setWorkingAntenna,
+            self.cmd_setOutputPower,
+            self.cmd_setTemporaryOutputPower,
+            self.cmd_setFrequencyRegion,
+            self.cmd_read,
+            self.cmd_inventory,
+            self.cmd_realtimeInventory,
+            self.cmd_fastSwitchInventory,
+            self.cmd_customizedSessionTargetInventory,
+            self.cmd_tag_select,
+        ])
+
+        # Requests waiting for a response, by command
+        self.pendingRequests = {}
+        self.requestLock = threading.Lock()
+        self.requestTimeout = 0.5 # seconds per attempt
+        self.requestRetries = 3
+        # Error codes worth sending the command again
+        self.retryErrorCodes = frozenset([0x11])
+        # Request -> response time of the last attempt
+        self.latency = LatencyHistogram.LatencyHistogram()
+
+        # Response parsers by command, see parseResponse
+        self.parsers = {
+            self.cmd_inventory: self.parseBufferInventory,
+            self.cmd_read: self.parseReadTag,
+            self.cmd_get_inventory_buffer: self.parseBufferTag,
+            self.cmd_get_and_reset_inventory_buffer: self.parseBufferTag,
+            self.cmd_realtimeInventory: self.parseInventory,
+            self.cmd_fastSwitchInventory: self.parseFastSwitchInventory,
+            self.cmd_customizedSessionTargetInventory: self.parseInventory,
+            self.cmd_getReaderTemperature: self.parseTemperature,
+            self.cmd_getOutputPower: self.parseOutputPower,
+            self.cmd_tag_select: self.parseTagMask,
+        }
+
+    """
+    Reader address, changing it drops every cached frame
+    """
+    @property
+    def readId(self):
+        return self.__readId
+
+    @readId.setter
+    def readId(self, readId):
+        self.__readId = readId
+        self.frameCache = {}
 
 
     """
@@ -86,9 +242,7 @@ class ReaderModule:
     mode: self.baudrate_38400 or self.baudrate_115200
     """
     def setUartBaudrate(self, mode):
-        databarr = bytearray()
-        databarr.append(mode)
-        return self.getCmdWithData(self.cmd_setUartBaudrate, databarr)
+        return self.getCmdWithData(self.cmd_setUartBaudrate, (mode,))
 
     """
     Get Firmware Version
@@ -97,19 +251,18 @@ class ReaderModule:
         return self.getCmd(self.cmd_getFirmwareVersion)
 
     """
-    Set Reader Address
+    Set Reader Address, the frame goes to the current address
+    address: 0x00 ~ 0xFE
     """
-    def setReaderAddress(self, databarr):
-        return self.getCmdWithData(self.setReaderAddress(), databarr)
+    def setReaderAddress(self, address):
+        return self.getCmdWithData(self.cmd_setReaderAddress, (address,))
 
     """
     antenna: self.working_antenna1 or self.working_antenna2
             or self.working_antenna3 or self.working_antenna4
     """
     def setWorkingAntenna(self, antenna):
-        databarr = bytearray()
-        databarr.append(antenna)
-        return self.getCmdWithData(self.cmd_setWorkingAntenna, databarr)
+        return self.getCmdWithData(self.cmd_setWorkingAntenna, (antenna,))
 
     def getWorkingAntenna(self):
         return self.getCmd(self.cmd_getWorkingAntenna)
@@ -118,18 +271,13 @@ class ReaderModule:
     power: 0 to 33
     """
     def setOutputPower(self, powerList):
-        databarr = bytearray()
-        for power in powerList:
-            databarr.append(power)
-        return self.getCmdWithData(self.cmd_setOutputPower, databarr)
+        return self.getCmdWithData(self.cmd_setOutputPower, tuple(powerList))
     
     """
     power: 0 to 33
     """
     def setTemporaryOutputPower(self, power):
-        databarr = bytearray()
-        databarr.append(power)
-        return self.getCmdWithData(self.cmd_setTemporaryOutputPower, databarr)
+        return self.getCmdWithData(self.cmd_setTemporaryOutputPower, (power,))
 
     def getOutputPower(self):
         return self.getCmd(self.cmd_getOutputPower)
@@ -140,28 +288,38 @@ class ReaderModule:
     end: endFrequency
     """
     def setFrequencyRegion(self, region, start, end):
-        databarr = bytearray()
-        databarr.append(region)
-        databarr.append(start)
-        databarr.append(end)
-        return self.getCmdWithData(self.cmd_setFrequencyRegion, databarr)
+        return self.getCmdWithData(self.cmd_setFrequencyRegion, (region, start, end))
 
     """
     By Country
     """
     def setFrequencyRegionByCountry(self, country):
-        if country == "VN (918.9 - 922.9)":
-            region = self.frequencyFCC
-            start = 0x29
-            end = 0x30
-        else:
+        region = self.countryRegion(country)
+        if region is None:
             return False
 
-        return self.setFrequencyRegion(region, start, end)
+        return self.setFrequencyRegion(*region)
+
+    """
+    (region, start, end) of a country, as getFrequencyRegion reports it, None when unknown
+    """
+    def countryRegion(self, country):
+        if country == "VN (918.9 - 922.9)":
+            return (self.frequencyFCC, 0x29, 0x30)
+        return None
 
     def getFrequencyRegion(self):
         return self.getCmd(self.cmd_getFrequencyRegion)
 
+    """
+    RF link profile: 0xD0 ~ 0xD3, the reader keeps it in flash
+    """
+    def setRfLinkProfile(self, profile):
+        return self.getCmdWithData(self.cmd_setRfLinkProfile, (profile,))
+
+    def getRfLinkProfile(self):
+        return self.getCmd(self.cmd_getRfLinkProfile)
+
     """
     set, get
     identifier: 12bytes(hex string)
@@ -179,11 +337,7 @@ class ReaderModule:
     repeat:0x00(default)
     """
     def customizeSessionTargetInventory(self, session, target, repeat):
-        databarr = bytearray()
-        databarr.append(session)
-        databarr.append(target)
-        databarr.append(repeat)
-        return self.getCmdWithData(self.cmd_customizedSessionTargetInventory, databarr)
+        return self.getCmdWithData(self.cmd_customizedSessionTargetInventory, (session, target, repeat))
 
     """
     Read tag
@@ -192,11 +346,7 @@ class ReaderModule:
     WordCount:0x00
     """
     def readTag(self, memBank, wordAdd, wordCnt):
-        databarr = bytearray()
-        databarr.append(memBank)
-        databarr.append(wordAdd)
-        databarr.append(wordCnt)
-        return self.getCmdWithData(self.cmd_read, databarr)
+        return self.getCmdWithData(self.cmd_read, (memBank, wordAdd, wordCnt))
     
     """
     Read tag both Reserved, Tid and User
@@ -209,22 +359,8 @@ class ReaderModule:
     readMode: 0x00(One tag, fastest), 0x01(One Tag with Session), 0x02(Multi tags with session)
     """
     def readMutiTag(self, resAdd, resLen, tidAdd, tidLen, userAdd, userLen, session, target, readMode, timeout):
-        databarr = bytearray()
-        databarr.append(resAdd)
-        databarr.append(resLen)    
-        databarr.append(tidAdd)
-        databarr.append(tidLen)
-        databarr.append(userAdd)
-        databarr.append(userLen)
-        databarr.append(0x00)
-        databarr.append(0x00)
-        databarr.append(0x00)
-        databarr.append(0x00)
-        databarr.append(session)
-        databarr.append(target)
-        databarr.append(readMode)
-        databarr.append(timeout)
-        return self.getCmdWithData(self.cmd_read, databarr)
+        return self.getCmdWithData(self.cmd_read, (resAdd, resLen, tidAdd, tidLen, userAdd, userLen,
+                                                   0x00, 0x00, 0x00, 0x00, session, target, readMode, timeout))
 
     """
     Write Tag
@@ -251,9 +387,29 @@ class ReaderModule:
     repeat:0x00(default)
     """
     def realtimeInventory(self, btrepeat):
-        databarr = bytearray()
-        databarr.append(btrepeat)
-        return self.getCmdWithData(self.cmd_realtimeInventory, databarr)
+        return self.getCmdWithData(self.cmd_realtimeInventory, (btrepeat,))
+
+    """
+    Fast Switch Antenna Inventory, one command covers every antenna
+    antennaList: up to 4 of self.working_antenna1 ~ 4, unused slots are skipped
+    stay: inventory rounds on each antenna, int or list per antenna
+    interval: rest time between antennas (ms)
+    repeat: times to run the whole antenna sequence
+    """
+    def fastSwitchInventory(self, antennaList, stay, interval, repeat):
+        if type(stay) is int:
+            stay = [stay] * len(antennaList)
+        databarr = []
+        for slot in range(4):
+            if slot < len(antennaList):
+                databarr.append(antennaList[slot])
+                databarr.append(stay[slot])
+            else:
+                databarr.append(0xFF)
+                databarr.append(0x00)
+        databarr.append(interval)
+        databarr.append(repeat)
+        return self.getCmdWithData(self.cmd_fastSwitchInventory, tuple(databarr))
     """
     EPC Select
     """
@@ -277,19 +433,14 @@ class ReaderModule:
     EPC Select Clear
     """
     def tagSelectClear(self, maskNo):
-        databarr = bytearray()
-        databarr.append(maskNo)
-        return self.getCmdWithData(self.cmd_tag_select, databarr)
+        return self.getCmdWithData(self.cmd_tag_select, (maskNo,))
     
     
     """
     EPC Select Query
     """
     def tagSelectQuery(self):
-        databarr = bytearray()
-        databarr.append(0x20)
-        
-        return self.getCmdWithData(self.cmd_tag_select, databarr)
+        return self.getCmdWithData(self.cmd_tag_select, (0x20,))
 
     """
     Reset Inventory Buffer
@@ -297,31 +448,58 @@ class ReaderModule:
     def reset_inventoryBuffer(self):
         return self.getCmd(self.cmd_reset_inventory_buffer)
 
+    """
+    Buffered Inventory
+    Tags are kept (unique) in reader buffer, read them with getInventoryBuffer
+    repeat: inventory rounds
+    """
+    def bufferInventory(self, repeat):
+        return self.getCmdWithData(self.cmd_inventory, (repeat,))
+
+    """
+    Get Inventory Buffer, one response frame per unique tag
+    """
+    def getInventoryBuffer(self):
+        return self.getCmd(self.cmd_get_inventory_buffer)
+
+    def getAndResetInventoryBuffer(self):
+        return self.getCmd(self.cmd_get_and_reset_inventory_buffer)
+
+    def getInventoryBufferTagCount(self):
+        return self.getCmd(self.cmd_get_inventory_buffer_tag_count)
+
     """
     private Method
+    Frames are immutable bytes, parameterless and cachedCommands frames
+    are built once per (readId, cmd, data) and then served from frameCache
     """
     def getCmd(self, cmd):
-        bytearr = bytearray()
-        bytearr.append(0xA0)#head
-        bytearr.append(0x03)#dataLen
-        bytearr.append(self.readId)#readId(Address)
-        bytearr.append(cmd)#command
-        bytearr.append(self.checksum(bytearr, 0, len(bytearr)))#checksum
-        return bytearr
+        key = (self.readId, cmd)
+        frame = self.frameCache.get(key)
+        if frame is None:
+            frame = self.buildCmd(cmd, ())
+            self.frameCache[key] = frame
+        return frame
 
     def getCmdWithData(self, cmd, databarr):
+        if cmd not in self.cachedCommands:
+            return self.buildCmd(cmd, databarr)
+        key = (self.readId, cmd, databarr if type(databarr) is tuple else tuple(databarr))
+        frame = self.frameCache.get(key)
+        if frame is None:
+            frame = self.buildCmd(cmd, databarr)
+            self.frameCache[key] = frame
+        return frame
+
+    def buildCmd(self, cmd, databarr):
         bytearr = bytearray()
         bytearr.append(0xA0)#head
-        dataLen = len(databarr)
-        totaldataLen = dataLen + 3
-        bytearr.append(totaldataLen)#dataLen
+        bytearr.append(len(databarr) + 3)#dataLen
         bytearr.append(self.readId)#readId(Address)
         bytearr.append(cmd)#command
-        #data array copy
-        for index in range(dataLen):
-            bytearr.append(databarr[index])
-        bytearr.append(self.checksum(bytearr, 0, len(bytearr)))#command
-        return bytearr
+        bytearr += bytes(databarr)#data array copy
+        bytearr.append(self.checksum(bytearr, 0, len(bytearr)))#checksum
+        return bytes(bytearr)
     
     """
     Get Reader Temperature
@@ -401,7 +579,16 @@ class ReaderModule:
                 print (ex.message)
         return msgTranList
     
+    """
+    Streaming analyze, partial frame is kept in decoder until next call
+    """
     def analyzeDataAll(self, databarr):
+        return self.decoder.decode(databarr)
+
+    """
+    Previous analyzeDataAll, kept for FrameDecoder benchmark
+    """
+    def analyzeDataAllLegacy(self, databarr):
         databarr = bytearray(databarr)
         if len(self.btAryBuffer) > 0:
             databarr = self.btAryBuffer + databarr
@@ -503,10 +690,231 @@ class ReaderModule:
 
 
     def checksum(self, arr, startpos, nlen):
-        btsum = 0x00
-        for index in range(startpos, nlen):
-            btsum += arr[index]
-        return ((~btsum) + 1 & 0xFF)
+        return -sum(arr[startpos:nlen]) & 0xFF
+
+    """
+    Request / Response
+    Write frame and return a Future resolved by the first response with
+    the same command: result is the response data, error codes raise
+    ReaderError and no response after all retries raises TimeoutError.
+    The receive path must pass every frame to resolveResponse.
+    """
+    def request(self, connection, frame, timeout=None, retries=None):
+        pending = PendingRequest(connection, frame,
+                                 self.requestTimeout if timeout is None else timeout,
+                                 self.requestRetries if retries is None else retries)
+        with self.requestLock:
+            self.pendingRequests.setdefault(pending.cmd, deque()).append(pending)
+            self.armRequest(pending)
+        self.sendRequest(pending)
+        return pending.future
+
+    """
+    Start the timer of the next attempt, requestLock held: the expire /
+    response -> resend decision and the new timer are one step, expiries
+    of earlier attempts are dropped by requestExpired
+    """
+    def armRequest(self, pending):
+        pending.attempt += 1
+        pending.timer = threading.Timer(pending.timeout, self.requestExpired, [pending, pending.attempt])
+        pending.timer.daemon = True
+        pending.sentTime = time.monotonic()
+        pending.timer.start()
+
+    def sendRequest(self, pending):
+        try:
+            pending.connection.serWrite(pending.frame)
+        except Exception as err:
+            self.finishRequest(pending, err)
+
+    def requestExpired(self, pending, attempt):
+        with self.requestLock:
+            queue = self.pendingRequests.get(pending.cmd)
+            if not queue or pending not in queue or pending.attempt != attempt:
+                # Already answered or sent again
+                return
+            retry = pending.retries > 0
+            if retry:
+                pending.retries -= 1
+                self.armRequest(pending)
+            else:
+                queue.remove(pending)
+        if retry:
+            self.sendRequest(pending)
+        else:
+            pending.future.set_exception(TimeoutError("No response for command 0x{0:02X}".format(pending.cmd)))
+
+    def finishRequest(self, pending, error):
+        with self.requestLock:
+            queue = self.pendingRequests.get(pending.cmd)
+            if not queue or pending not in queue:
+                return
+            queue.remove(pending)
+            pending.timer.cancel()
+        pending.future.set_exception(error)
+
+    """
+    True when msgTran came from this reader, or its address is unknown
+    """
+    def ownsFrame(self, msgTran):
+        return msgTran.address is None or self.readId == 0xFF or msgTran.address == self.readId
+
+    """
+    Return True when msgTran answered a pending request,
+    frames of other readers on a shared bus are not ours
+    """
+    def resolveResponse(self, msgTran):
+        if not self.ownsFrame(msgTran):
+            return False
+        with self.requestLock:
+            queue = self.pendingRequests.get(msgTran.cmd)
+            if not queue:
+                return False
+            pending = queue[0]
+            databarr = msgTran.databarr
+            isError = len(databarr) == 1 and databarr[0] in ERROR_CODES
+            pending.timer.cancel()
+            self.latency.add(time.monotonic() - pending.sentTime)
+            if isError and databarr[0] in self.retryErrorCodes and pending.retries > 0:
+                # Keep it queued and send again
+                pending.retries -= 1
+                self.armRequest(pending)
+                retry = True
+            else:
+                queue.popleft()
+                retry = False
+        if retry:
+            self.sendRequest(pending)
+        elif isError:
+            pending.future.set_exception(ReaderError(databarr[0]))
+        else:
+            pending.future.set_result(databarr)
+        return True
+
+    """
+    Response Parsers
+    Single byte responses are error codes, other commands fall back to it
+    """
+    def parseResponse(self, cmd, databarr):
+        return self.parsers.get(cmd, self.parseErrorCode)(databarr)
+
+    def parseErrorCode(self, databarr):
+        return ErrorRecord(databarr[0])
+
+    """
+    0x89 / 0x8B
+    Tag:   FreqAnt(1) PC(2) EPC(N) RSSI(1)
+    Total: AntId(1) ReadRate(2) TotalRead(4)
+    """
+    def parseInventory(self, databarr):
+        dataLen = len(databarr)
+        if dataLen == 1:
+            return ErrorRecord(databarr[0])
+        if dataLen == 7:
+            return TotalCountRecord._make(TOTAL_COUNT.unpack(databarr))
+        rssi = databarr[dataLen - 1]
+        antenna = (databarr[0] & 0x03) + (1 if rssi & 0x80 == 0 else 5)
+        return InventoryRecord(antenna, PC.unpack_from(databarr, 1)[0], bytes(databarr[3:dataLen - 1]), (rssi & 0x7F) - 129)
+
+    """
+    0x80
+    AntId(1) TagCount(2) ReadRate(2) TotalRead(4)
+    """
+    def parseBufferInventory(self, databarr):
+        if len(databarr) == 1:
+            return ErrorRecord(databarr[0])
+        return BufferInventoryRecord._make(BUFFER_INVENTORY.unpack(databarr))
+
+    """
+    0x90 / 0x91, one tag per frame
+    TagCount(2) DataLen(1) PC(2) EPC(N) CRC(2) RSSI(1) FreqAnt(1) InvCount(1)
+    """
+    def parseBufferTag(self, databarr):
+        dataLen = len(databarr)
+        if dataLen == 1:
+            return ErrorRecord(databarr[0])
+        epcEnd = 3 + databarr[2] - 2
+        rssi = databarr[dataLen - 3]
+        antenna = (databarr[dataLen - 2] & 0x03) + (1 if rssi & 0x80 == 0 else 5)
+        return BufferTagRecord(PC.unpack_from(databarr, 0)[0], antenna, PC.unpack_from(databarr, 3)[0],
+                               bytes(databarr[5:epcEnd]), (rssi & 0x7F) - 129, databarr[dataLen - 1])
+
+    """
+    Whole buffer response: list of frames to list of BufferTagRecord
+    complete is True once TagCount records arrived or the buffer was empty
+    """
+    def parseInventoryBuffer(self, msgTranList):
+        records = []
+        complete = False
+        for msgTran in msgTranList:
+            if msgTran.cmd != self.cmd_get_inventory_buffer and msgTran.cmd != self.cmd_get_and_reset_inventory_buffer:
+                continue
+            record = self.parseBufferTag(msgTran.databarr)
+            if type(record) is ErrorRecord:
+                complete = True
+                continue
+            records.append(record)
+            complete = len(records) >= record.tagCount
+        return records, complete
+
+    """
+    0x8A
+    Tag:     FreqAnt(1) PC(2) EPC(N) RSSI(1)
+    AntErr:  AntId(1) ErrorCode(1)
+    Total:   TotalRead(3) CommandDuration(4, ms)
+    """
+    def parseFastSwitchInventory(self, databarr):
+        dataLen = len(databarr)
+        if dataLen == 1:
+            return ErrorRecord(databarr[0])
+        if dataLen == 2:
+            return AntennaErrorRecord(databarr[0] + 1, databarr[1])
+        if dataLen == 7:
+            return FastSwitchTotalRecord(int.from_bytes(databarr[0:3], 'big'), int.from_bytes(databarr[3:7], 'big'))
+        return self.parseInventory(databarr)
+
+    """
+    0x81
+    TagCount(2) DataLen(1) PC(2) EPC(N) CRC(2) ReadData(ReadLen) ReadLen(1) AntId(1) ReadCount(1)
+    """
+    def parseReadTag(self, databarr):
+        dataLen = len(databarr)
+        if dataLen == 1:
+            return ErrorRecord(databarr[0])
+        readLen = databarr[dataLen - 3]
+        epcEnd = 5 + databarr[2] - readLen - 4
+        readCount = databarr[dataLen - 1]
+        antenna = (databarr[dataLen - 2] & 0x03) + (1 if readCount & 0x80 == 0 else 5)
+        return ReadTagRecord(antenna, PC.unpack_from(databarr, 3)[0], bytes(databarr[5:epcEnd]),
+                             bytes(databarr[epcEnd + 2:epcEnd + 2 + readLen]), readCount & 0x7F)
+
+    """
+    0x7B
+    Sign(1, 0x00 minus) Value(1)
+    """
+    def parseTemperature(self, databarr):
+        if len(databarr) == 1:
+            return ErrorRecord(databarr[0])
+        return TemperatureRecord(databarr[1] if databarr[0] else -databarr[1])
+
+    """
+    0x77
+    one power for all antennas, or one per antenna
+    """
+    def parseOutputPower(self, databarr):
+        return OutputPowerRecord(tuple(databarr))
+
+    """
+    0x98 query, one frame per mask
+    MaskNo(1) MaskQuantity(1) Target(1) Action(1) Membank(1) StartAdd(1) MaskLen(1, bits) Mask(N) Truncate(1)
+    """
+    def parseTagMask(self, databarr):
+        if len(databarr) == 1:
+            return ErrorRecord(databarr[0])
+        maskLen = databarr[6]
+        maskEnd = 7 + (maskLen + 7) // 8
+        return TagMaskRecord(databarr[0], databarr[1], databarr[2], databarr[3], databarr[4], databarr[5],
+                             maskLen, bytes(databarr[7:maskEnd]), databarr[maskEnd])
 
     """
     Analyze by Cmd
@@ -0,0 +1,99 @@
+# coding=UTF-8
+import time
+
+import FrameDecoder
+import ReaderModule
+
+class ReaderState:
+    """
+    Reader settings read once at connect, so settings the reader already
+    has are not written again after every restart.
+
+    query() writes the get commands (output power, frequency region,
+    working antenna, RF link profile, tag select masks) in one write and
+    collects the answers with its own decoder. Like BaudNegotiator it runs
+    on the connect path, before the receive thread reads the port.
+    A value stays None when the reader did not answer it.
+    """
+    PROFILES = (0xD0, 0xD1, 0xD2, 0xD3)
+
+    def __init__(self):
+        self.power = None
+        self.region = None
+        self.antenna = None
+        self.profile = None
+        self.masks = None
+
+    """
+    Return True when every query was answered within timeout
+    """
+    def query(self, connection, reader, timeout=0.5):
+        frames = {
+            reader.cmd_getOutputPower: reader.getOutputPower(),
+            reader.cmd_getFrequencyRegion: reader.getFrequencyRegion(),
+            reader.cmd_getWorkingAntenna: reader.getWorkingAntenna(),
+            reader.cmd_getRfLinkProfile: reader.getRfLinkProfile(),
+            reader.cmd_tag_select: reader.tagSelectQuery(),
+        }
+        pending = set(frames)
+        masks = {}
+        decoder = FrameDecoder.FrameDecoder()
+        connection.serWrite(b''.join(frames.values()))
+        deadline = time.monotonic() + timeout
+        while pending and time.monotonic() < deadline:
+            data = connection.serRead()
+            if not data:
+                continue
+            for msgTran in decoder.decode(data):
+                if msgTran.cmd not in pending or not reader.ownsFrame(msgTran):
+                    continue
+                if msgTran.cmd == reader.cmd_tag_select:
+                    if self.storeMask(reader, msgTran.databarr, masks):
+                        pending.discard(msgTran.cmd)
+                    continue
+                self.store(reader, msgTran.cmd, msgTran.databarr)
+                pending.discard(msgTran.cmd)
+        return not pending
+
+    """
+    Single byte answers can be error codes, known codes and values out of range are taken as one
+    """
+    def store(self, reader, cmd, databarr):
+        if cmd == reader.cmd_getOutputPower:
+            if len(databarr) == 4:
+                self.power = tuple(databarr)
+            elif len(databarr) == 1 and databarr[0] <= 33 and databarr[0] not in ReaderModule.ERROR_CODES:
+                self.power = (databarr[0],) * 4
+        elif cmd == reader.cmd_getFrequencyRegion:
+            if len(databarr) == 3:
+                self.region = tuple(databarr)
+        elif cmd == reader.cmd_getWorkingAntenna:
+            if len(databarr) == 1 and databarr[0] <= 0x03:
+                self.antenna = databarr[0]
+        elif cmd == reader.cmd_getRfLinkProfile:
+            if len(databarr) == 1 and databarr[0] in self.PROFILES:
+                self.profile = databarr[0]
+
+    """
+    One 0x98 query frame, True when every mask arrived or there are none
+    """
+    def storeMask(self, reader, databarr, masks):
+        if len(databarr) == 1:
+            self.masks = [] if databarr[0] == 0x10 else None
+            return True
+        record = reader.parseTagMask(databarr)
+        masks[record.maskNo] = record
+        if len(masks) < record.maskCount:
+            return False
+        self.masks = [masks[maskNo] for maskNo in sorted(masks)]
+        return True
+
+    def report(self):
+        fields = [
+            ("power", None if self.power is None else "/".join(str(power) for power in self.power)),
+            ("region", None if self.region is None else "{0} {1:02X}-{2:02X}".format(*self.region)),
+            ("antenna", None if self.antenna is None else self.antenna + 1),
+            ("profile", None if self.profile is None else "{0:02X}".format(self.profile)),
+            ("masks", None if self.masks is None else len(self.masks)),
+        ]
+        return "Reader state: " + ", ".join("{0} {1}".format(name, "?" if value is None else value) for name, value in fields)
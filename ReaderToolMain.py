@@ -6,7 +6,6 @@ from ctypes import *
 import os
 import sys
 import time
-import datetime
 import logging
 import logging.config
 from configparser import ConfigParser
@@ -19,10 +18,14 @@ from UiReaderTool import Ui_MainWindow
 import SocketModule
 import SerialportModule
 import ReaderModule
+import BaudNegotiator
 import SuperIOModule
 import EncodeTag
 import RecordModule
 import Database
+import TagStore
+import TagEvents
+import ReadClock
 
 def trap_exc_during_debug(*args):
     # when app raises uncaught exception, print info
@@ -56,7 +59,6 @@ class Worker(QtCore.QThread):
 class MainWindow(QMainWindow, Ui_MainWindow):
 
     monitorSignal = QtCore.pyqtSignal()
-    inventorySingal = QtCore.pyqtSignal(dict)
     readAsciiSingal = QtCore.pyqtSignal(str)
 
     def __init__(self, gpio, parent=None):
@@ -82,9 +84,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.worker.start()
         #self.monitorSignal.emit()
         
-        self.inventorySingal.connect(self.inventoryUI)
         self.readAsciiSingal.connect(self.readAsciiUI)
 
+        # Tag reads reach the table in one batch per frame tick
+        self.tagEvents = TagEvents.TagEventQueue()
+        self.tagTimer = QtCore.QTimer(self)
+        self.tagTimer.timeout.connect(self.deliver_tags)
+        self.tagTimer.start(50)
+
         # logging setting
         logging.config.fileConfig('logging.conf')
         self.logger = logging.getLogger('root')
@@ -270,6 +277,24 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         # Reader Moudle
         self.reader = ReaderModule.ReaderModule()                
+
+        # Response handlers by command, see analyze_data
+        self.responseHandlers = {
+            self.reader.cmd_read: self.process_read_tag,
+            self.reader.cmd_write: self.process_write_tag,
+            self.reader.cmd_realtimeInventory: self.process_realtime_inventory,
+            self.reader.cmd_customizedSessionTargetInventory: self.process_realtime_inventory,
+            self.reader.cmd_setTemporaryOutputPower: self.process_set_temporary_output_power,
+            self.reader.cmd_setReaderId: self.process_set_reader_id,
+            self.reader.cmd_getReaderId: self.process_get_reader_id,
+            self.reader.cmd_setUartBaudrate: self.process_set_baudrate,
+            self.reader.cmd_setWorkingAntenna: self.process_set_work_antenna,
+            self.reader.cmd_setOutputPower: self.process_set_output_power,
+            self.reader.cmd_getOutputPower: self.process_get_output_power,
+            self.reader.cmd_setFrequencyRegion: self.process_set_frequency_region,
+            self.reader.cmd_getReaderTemperature: self.process_get_reader_temperature,
+            self.reader.cmd_reset_inventory_buffer: self.process_reset_inventory_buffer,
+        }
         
         # TID & User Memory Check
         if self.configManager.get('Show', 'tid') == "on":
@@ -324,7 +349,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.tableView.setColumnWidth(5, 80)
         self.tableView.setColumnWidth(6, 0)
         #self.tableView.setColumnWidth(6, self.UserMemoryWidth)
-        self.tags = []
+        # Read timestamps (monotonic ns), formatted for display and records only
+        self.clock = ReadClock.ReadClock()
+        # Tags of this session by EPC + TID, one table row each
+        self.tagStore = TagStore.TagStore(withTid=True)
         
         # Inventory Time Consume
         self.passingTime = 0
@@ -382,8 +410,6 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self._sentinel = object()
 
         self.inventoryRate = 1 # Use to dynamic control inventory command frequency
-        self.blSetPower = False
-        self.blSetFrequency = False
 
         recordThread = threading.Thread(target=self.dataRecord, args=(self.queue, ))
         recordThread.start()
@@ -410,10 +436,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     Check connect status
     """
     def check_connect(self):
-        if self.socket.isConnect() == False and self.rs232.isConnect() == False:
-            return False
-        else:
-            return True
+        return self.connection.isConnect()
 
     """
     Realtime Inventory Process
@@ -446,8 +469,16 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             # Initial Setting
             nIndexAntenna = 0
             self.nCommand = 0
+            self.tagEvents.resetStats()
             self.session = self.cmbSession.currentIndex()
             self.target = self.cmbTarget.currentIndex()
+
+            # Prebuilt command frames, the loop only writes them
+            cmdReadTid = self.reader.readMutiTag(0x00, 0x00, 0x00, 0x06, 0x00, 0x00, self.session, self.target, 0x02, 0x01)
+            cmdReadUser = self.reader.readMutiTag(0x00, 0x00, 0x00, 0x00, 0x00, 0x02, self.session, self.target, 0x02, 0x01)
+            cmdReadTidUser = self.reader.readMutiTag(0x00, 0x00, 0x00, 0x06, 0x00, 0x04, self.session, self.target, 0x02, 0x01)
+            cmdInventory = self.reader.customizeSessionTargetInventory(self.session, self.target, 0x01)
+            cmdAntenna = [self.reader.setWorkingAntenna(int(ant) - 1) for ant in self.antenna]
             print("Start reading...")
 
         while self.blInventory:  
@@ -465,29 +496,29 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                         self.nCommand = 1
                         if(self.blTIDCheck and not self.blUserMemoryCheck):
                             self.logger.debug("Send Read TID Command!")
-                            self.connection.serWrite(self.reader.readMutiTag(0x00, 0x00, 0x00, 0x06, 0x00, 0x00, self.session, self.target, 0x02, 0x01))
+                            self.connection.serWrite(cmdReadTid)
                         elif (not self.blTIDCheck and self.blUserMemoryCheck):
                             self.logger.debug("Send Read User Command!")
-                            self.connection.serWrite(self.reader.readMutiTag(0x00, 0x00, 0x00, 0x00, 0x00, 0x02, self.session, self.target, 0x02, 0x01))
+                            self.connection.serWrite(cmdReadUser)
                         elif (self.blTIDCheck and self.blUserMemoryCheck):
                             self.logger.debug("Send Read TID and User Command!")
-                            self.connection.serWrite(self.reader.readMutiTag(0x00, 0x00, 0x00, 0x06, 0x00, 0x04, self.session, self.target, 0x02, 0x01))
+                            self.connection.serWrite(cmdReadTidUser)
                         else:
                             self.logger.debug("Send Realtime/Customize Inventory Command!")
                             #self.connection.serWrite(self.reader.realtimeInventory(self.reader.realtimeInventoryRepeat))
-                            self.connection.serWrite(self.reader.customizeSessionTargetInventory(self.session, self.target, 0x01))
+                            self.connection.serWrite(cmdInventory)
                     else:
                         # Change antenna command
                         self.nCommand = 0
                         nIndexAntenna = nIndexAntenna + 1
                         self.btWorkAntenna = int(self.antenna[nIndexAntenna]) - 1
-                        self.connection.serWrite(self.reader.setWorkingAntenna(self.btWorkAntenna))
+                        self.connection.serWrite(cmdAntenna[nIndexAntenna])
                 else:
                     # Set antenna to 1
                     self.nCommand = 0
                     nIndexAntenna = 0
                     self.btWorkAntenna = int(self.antenna[nIndexAntenna]) - 1
-                    self.connection.serWrite(self.reader.setWorkingAntenna(self.btWorkAntenna))
+                    self.connection.serWrite(cmdAntenna[nIndexAntenna])
                 
                 # When Tag Quantity is small, sleep short. When quantity is large, sleep long
                 # Dynamic Inventory Time Delay
@@ -495,6 +526,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
             except Exception as err:
                 self.logger.debug("Error: {0}".format(err))
+
+        for line in self.tagEvents.report():
+            self.logger.debug(line)
                 
                 
     @QtCore.pyqtSlot()            
@@ -541,54 +575,12 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     """
     def analyze_data(self, msgTranlist):
         for msgTran in msgTranlist:
-            if msgTran.cmd == 0x00:
+            self.reader.resolveResponse(msgTran)
+            handler = self.responseHandlers.get(msgTran.cmd)
+            if handler is not None:
+                handler(msgTran.databarr)
+            elif msgTran.cmd == 0x00:
                 self.logger.debug("Error: Checksum is not correct!")
-                continue
-            elif msgTran.cmd == 0x81:
-                self.process_read_tag(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x82:
-                self.process_write_tag(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x89:
-                self.process_realtime_inventory(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x8B:
-                self.process_realtime_inventory(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x66:
-                self.process_set_temporary_output_power(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x67:
-                self.process_set_reader_id(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x68:
-                self.process_get_reader_id(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x71:
-                self.process_set_baudrate(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x74:
-                self.process_set_work_antenna(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x76:
-                self.process_set_output_power(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x77:
-                self.process_get_output_power(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x78:
-                self.process_set_frequency_region(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x7B:
-                self.process_get_reader_temperature(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x93:
-                self.process_reset_inventory_buffer(msgTran.databarr)
-                continue
-            elif msgTran.cmd == 0x98:
-                self.process_tag_select(msgTran.databarr)
-                continue
             else:
                 self.logger.debug("Cannot Recognize")
 
@@ -607,7 +599,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def process_set_baudrate(self, databarr):
         if self.process_error_code(databarr):
             self.configManager.set('RS232', 'baudrate', self.cmbSetBauRate.currentText())
-            self.configManager.write(open('config.ini', 'wb'))
+            BaudNegotiator.saveConfig(self.configManager)
             self.cmbBaudrate.setCurrentIndex(self.rs232.getBaudRate().index(self.cmbSetBauRate.currentText()))
 
     def process_set_work_antenna(self, databarr):
@@ -653,56 +645,61 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     Initialize Power and Region
     """
     def initialize_power(self):
-        if not (self.curPower[0] == self.txtPower1.text() and
-                self.curPower[1] == self.txtPower2.text() and
-                self.curPower[2] == self.txtPower3.text() and
-                self.curPower[3] == self.txtPower4.text()):
-            self.curPower = list(map(int, [self.txtPower1.text(), self.txtPower2.text(), self.txtPower3.text(), self.txtPower4.text()]))
-            
-            for i in range(len(self.curPower)-1):
-                if self.curPower[i] != self.curPower[i+1]:
-                    self.set_output_power(self.curPower)
-                    break
-                if i == len(self.curPower)-2:
-                    self.set_temporary_output_power(self.curPower[0])                   
+        powerList = list(map(int, [self.txtPower1.text(), self.txtPower2.text(), self.txtPower3.text(), self.txtPower4.text()]))
+        if self.curPower != powerList:
+            if len(set(powerList)) > 1:
+                blSetPower = self.set_output_power(powerList)
+            else:
+                blSetPower = self.set_temporary_output_power(powerList[0])
+            if blSetPower:
+                self.curPower = powerList
         
     """  
     Initialize Power and Region
     """
     def initialize_region(self):
         if not self.curRegion == self.cmbRegion.currentText() or self.start1 != self.FrequencyStart.text() or self.end1 != self.FrequencyEnd.text():
-            self.curRegion = self.cmbRegion.currentText()
-            self.set_frequency_region(self.curRegion)
+            if self.set_frequency_region(self.cmbRegion.currentText()):
+                self.curRegion = self.cmbRegion.currentText()
+
+    """
+    Send setting command and wait for its response, False on error or timeout
+    """
+    def request_setting(self, frame):
+        try:
+            self.reader.request(self.connection, frame).result()
+            return True
+        except Exception as err:
+            print ("Failed")
+            self.logger.debug("Error: {0}".format(err))
+            return False
 
     def set_output_power(self, powerList):
         print (f"Set output power Ant1: {powerList[0]}dbm, Ant2: {powerList[1]}dbm, Ant3: {powerList[2]}dbm, Ant4: {powerList[3]}dbm ... ", end="")
-        self.blSetPower = False
-        while not self.blSetPower:
-            self.connection.serWrite(self.reader.setOutputPower(powerList))
-            time.sleep(0.2)
+        if not self.request_setting(self.reader.setOutputPower(powerList)):
+            return False
         print ("Done")
         self.logger.debug("Set output power successfully")
+        return True
         
     def set_temporary_output_power(self, power):
         print (f"Set Temporary Output Power {int(power)}dbm ... ", end="")
-        self.blSetPower = False
-        while not self.blSetPower:
-            self.connection.serWrite(self.reader.setTemporaryOutputPower(int(power)))
-            time.sleep(0.2)
+        if not self.request_setting(self.reader.setTemporaryOutputPower(int(power))):
+            return False
         print ("Done")
         self.logger.debug("Set Temporary Output Power successfully")
+        return True
         
     def set_frequency_region(self, region):
         print (f"Set Frequency Region {region} ... ", end="")
-        self.blSetFrequency = False
-        while not self.blSetFrequency:
-            self.connection.serWrite(self.reader.setFrequencyRegionByCountry(str(region)))
-            time.sleep(0.2)
+        if not self.request_setting(self.reader.setFrequencyRegionByCountry(str(region))):
+            return False
         print ("Done")
         self.logger.debug("Set frequency region successfully")
+        return True
 
     def process_set_output_power(self, databarr):
-        self.blSetPower = self.process_error_code(databarr)
+        self.process_error_code(databarr)
 
     def process_get_output_power(self, databarr):
         if len(databarr) == 1:
@@ -721,10 +718,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             print ("Error")
     
     def process_set_temporary_output_power(self, databarr):
-        self.blSetPower = self.process_error_code(databarr)
+        self.process_error_code(databarr)
             
     def process_set_frequency_region(self, databarr):
-        self.blSetFrequency = self.process_error_code(databarr)
+        self.process_error_code(databarr)
 
     def process_write_tag(self, databarr):
         dataLen = len(databarr)
@@ -755,87 +752,45 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             print (d)
 
     def process_read_tag(self, databarr):
-        dataLen = len(databarr)
         try:
-            if dataLen == 1:
+            record = self.reader.parseReadTag(databarr)
+            if type(record) is ReaderModule.ErrorRecord:
                 self.process_error_code(databarr)
             else:
                 # Turn Digital Output on
                 for port in self.activeDOPortList:
                     self.gpio.set_gpio(port, self.gpio.on)
-                
-                """
-                N:len(databarr)
-                0:2bytes[Tag Count]
-                2:DataLen[]
-                3~N-4:PC(2),EPC(),CRC(2),ReadData()
-                N-3:ReadLen
-                N-2:AntId
-                N-1:ReadCount
-                """
-                
-                nDataLen = databarr[dataLen - 3]
-                nEpcLen = databarr[2] - nDataLen - 4
-                # PC
-                strPC = ""
-                for b in range(3, 5):
-                    strPC += str(hex(databarr[b]))[2:].zfill(2) + ' '
-                strPC = strPC.upper()
-                # EPC
-                strEPC = ""
-                epcEnd = 5 + nEpcLen
-                
-                if epcEnd <= dataLen:
-                    for b in range(3, epcEnd):
-                        nextEPC = str(hex(databarr[b]))[2:].zfill(2)
-                        strEPC += nextEPC + ' '
-                strEPC = strEPC.upper().replace(' ', '')
+
+                # EPC = PC + EPC
+                strEPC = "{0:04X}{1}".format(record.pc, record.epc.hex().upper())
 
                 if(self.blReadAsciiClick):
                     self.readAsciiSingal.emit(strEPC)
                 else: 
                     # Show Inventory Result         
                     # TID and User
-                    strData = ""
-                    DataEnd = 7 + nEpcLen + nDataLen
-                    if DataEnd <= dataLen:
-                        for b in range(7 + nEpcLen, DataEnd):
-                            strData += str(hex(databarr[b]))[2:].zfill(2) + ' '
-                    strData = strData.upper()
-                    strTid = ""
-                    strUser = ""
-                    tidColVal = ""
+                    tid = b''
                     userColVal = ""
                     if(self.blTIDCheck and not self.blUserMemoryCheck):
-                        strTid = strData
-                        tidColVal = strTid.replace(' ', '')
+                        tid = record.data
                     elif (not self.blTIDCheck and self.blUserMemoryCheck):
-                        strUser = strData
-                        userColVal = strUser.replace(' ', '')
+                        userColVal = record.data.hex().upper()
                     elif (self.blTIDCheck and self.blUserMemoryCheck):
-                        strTid = strData[:36]
-                        strUser = strData[36:]
-                        tidColVal = strTid.replace(' ', '')
-                        userColVal = strUser.replace(' ', '')
+                        tid = record.data[:12]
+                        userColVal = record.data[12:].hex().upper()
+                    tidColVal = tid.hex().upper()
                     
-                    # Antenna
-                    if (databarr[dataLen-1] & 0x80) == 0:
-                        ant = (databarr[dataLen-2] & 0x03) + 1
-                    else:
-                        ant = (databarr[dataLen-2] & 0x03) + 5
-                    
-                    if (int(strPC[0:2], 16)/4) <= (epcEnd-4):
-                        if str(ant) in self.antenna:
-                            dtNow = datetime.datetime.now().strftime('%Y/%m/%d %H:%M:%S.%f').split(".")[0]
+                    if ((record.pc >> 8)/4) <= (len(record.epc) + 1):
+                        if str(record.antenna) in self.antenna:
+                            entry, isNew = self.tagStore.upsert(record.epc, record.antenna, pc=record.pc, tid=tid)
                             tagDict = {
                                 self.epcCol: strEPC,
                                 self.readerIdCol: self.readerId,
-                                self.antennaCol: ant,
-                                self.timeCol: dtNow,
+                                self.antennaCol: record.antenna,
+                                self.timeCol: entry.lastSeen,
                                 self.tidCol: tidColVal
                             }
-                            self.inventorySingal.emit(tagDict)
-                            time.sleep(0.01)   
+                            self.tagEvents.put(tagDict, entry)
                     
         except Exception as e:
             print (e)
@@ -845,83 +800,70 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     Customized Session Target Inventory Data Analyze
     """
     def process_realtime_inventory(self, databarr):
-        dataLen = len(databarr)
         try:
-            if dataLen == 1:
+            record = self.reader.parseInventory(databarr)
+            if type(record) is ReaderModule.ErrorRecord:
                 print ("Datalen: 1")
                 self.process_error_code(databarr)
-            elif dataLen == 7:
+            elif type(record) is ReaderModule.TotalCountRecord:
                 self.logger.debug("Get Total Count Response!")
-                nReadRate = databarr[1] * 256 + databarr[2]
-                nDataCount = databarr[3] * 256 * 256 * 256 + databarr[4] * 256 * 256 + databarr[5] * 256 + databarr[6]
+                nDataCount = record.count
                 self.logger.debug("Tag Count: " + str(nDataCount))
                 # TODO: calculate related average value
                 self.inventoryRate = (lambda x: x if x>=1 else 1)((self.inventoryRate+nDataCount)/2)
                 
             else: 
-                nEpcLen = dataLen - 2
-                rssiLocation = 1 + nEpcLen
-                strEPC = ""
-                # EPC= PC + EPC
-                for b in range(1, 1 + nEpcLen):
-                    strEPC += str(hex(databarr[b]))[2:].zfill(2) + " "
-                strEPC = strEPC.upper().replace(' ', '')
-                dRSSI = databarr[rssiLocation] -129
+                # EPC = PC + EPC
+                strEPC = "{0:04X}{1}".format(record.pc, record.epc.hex().upper())
                 self.logger.debug('Tag: ' + strEPC)
                 
-                # Antenna
-                if (databarr[rssiLocation] & 0x80) == 0:
-                    ant = (databarr[0] & 0x03) + 1
-                else:
-                    ant = (databarr[0] & 0x03) + 5
-                
-                if (int(strEPC[0:2], 16)/4) <= (nEpcLen-1):
-                    if str(ant) in self.antenna:
-                        dtNow = datetime.datetime.now().strftime('%Y/%m/%d %H:%M:%S.%f').split(".")[0]
+                if ((record.pc >> 8)/4) <= (len(record.epc) + 1):
+                    if str(record.antenna) in self.antenna:
+                        entry, isNew = self.tagStore.upsert(record.epc, record.antenna, record.rssi, record.pc)
                         tagDict = {
                             self.epcCol: strEPC,
                             self.readerIdCol: self.readerId,
-                            self.antennaCol: ant,
-                            self.timeCol: dtNow,
+                            self.antennaCol: record.antenna,
+                            self.timeCol: entry.lastSeen,
                             self.tidCol: ""
                         }
-                        self.inventorySingal.emit(tagDict)
-                        time.sleep(0.01)
+                        self.tagEvents.put(tagDict, entry)
 
         except Exception as e:
             print (e)
 
 
-    @QtCore.pyqtSlot(dict)        
-    def inventoryUI(self, tagDict):
+    """
+    Tag reads queued since the last frame tick
+    """
+    @QtCore.pyqtSlot()
+    def deliver_tags(self):
+        batch = self.tagEvents.drain()
+        if not batch:
+            return
+        for tagDict, entry in batch:
+            self.inventoryUI(tagDict, entry)
+        self.tableView.setModel(self.model)
+
+    def inventoryUI(self, tagDict, entry):
 
         if self.blInventory:
-            # Detect Duplicate
-            hasExist = False
-            
             readEPC = tagDict[self.epcCol]
             readerId = tagDict[self.readerIdCol]
             readAnt = tagDict[self.antennaCol]
-            readTime = tagDict[self.timeCol]
             readTID = tagDict[self.tidCol] if self.tidCol else ""
             #readUserBank = tagDict[self.userCol] if self.userCol else ""
                  
-            #strData = readEPC + readTID + readUserBank
-            strData = readEPC + readTID
-            
             i = self.model.rowCount()
-            if len(self.tags) > 0:
-                if (strData) in self.tags:
-                    index = self.tags.index(strData)
-                    if readAnt == int(self.model.data(self.model.index(index, 4))):
-                        tagCount = int(self.model.data(self.model.index(index, 5))) + 1
-                        self.model.setItem(index, 5, QtGui.QStandardItem(str(tagCount)))
-                        self.tableView.setModel(self.model)
-                    hasExist = True
-            
-            if not hasExist:
+            if entry.row is not None:
+                # Repeat read, the row counts the reads on the tag's first antenna
+                if readAnt == entry.firstAntenna:
+                    self.model.setItem(entry.row, 5, QtGui.QStandardItem(str(entry.antennaCounts[readAnt])))
+            else:
                 # Update Tags
-                self.tags.append(strData)
+                entry.row = i
+                readTime = self.clock.format(tagDict[self.timeCol])
+                tagDict[self.timeCol] = readTime
 
                 # Decode EPC
                 decodeData = self.epcDecoder(readEPC)
@@ -948,10 +890,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 self.queue.put(tagDict)
                 
                 # Caculate Time Consuming
-                firstTimeTag = datetime.datetime.strptime(str(self.model.data(self.model.index(0, 3))), '%Y/%m/%d %H:%M:%S')
-                lastTimeTag = datetime.datetime.strptime(str(self.model.data(self.model.index(i, 3))), '%Y/%m/%d %H:%M:%S')
-                self.passingTime = round( (lastTimeTag -firstTimeTag).total_seconds(), 3)
-                self.tableView.setModel(self.model)
+                self.passingTime = round(self.clock.seconds(self.tagStore.firstSeen, entry.firstSeen), 3)
                 
             # update Tag Count
             self.lbInventoryQuantity.setText(str(self.model.rowCount()).zfill(4))
@@ -1001,129 +940,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     """
     def process_error_code(self, databarr):
         rtncode = databarr[0]
-        if rtncode == 0x10:
+        if rtncode == ReaderModule.SUCCESS:
             self.logger.debug("Success")
             return True
-        else:
-            # print "Error"
-            # switch Error Code
-            if rtncode == 0x11:
-                self.logger.debug("Command Fail")
-                return False
-            elif rtncode == 0x20:
-                self.logger.debug("MCU Reset Error")
-                return False
-            elif rtncode == 0x21:
-                self.logger.debug("CW On Error")
-                return False
-            elif rtncode == 0x22:
-                self.logger.debug("Antenna Mission Error")
-                return False
-            elif rtncode == 0x23:
-                self.logger.debug("Write Flash Error")
-                return False
-            elif rtncode == 0x24:
-                self.logger.debug("Read Flash Error")
-                return False
-            elif rtncode == 0x25:
-                self.loggger.debug("Set Output Power Error")
-                return False
-            elif rtncode == 0x31:
-                self.logger.debug("Tag Inventory Error")
-                return False
-            elif rtncode == 0x32:
-                self.logger.debug("Tag Read Error")
-                return False
-            elif rtncode == 0x33:
-                self.logger.debug("Tag Write Error")
-                return False
-            elif rtncode == 0x34:
-                self.logger.debug("Tag Lock Error")
-                return False
-            elif rtncode == 0x35:
-                self.logger.debug("Tag Kill Error")
-                return False
-            elif rtncode == 0x36:
-                self.logger.debug("No Tag Error")
-                return False
-            elif rtncode == 0x37:
-                self.logger.debug("Inventory Ok But Access Fail")
-                return False
-            elif rtncode == 0x38:
-                self.logger.debug("Buffer Is Empty Error")
-                return False
-            elif rtncode == 0x40:
-                self.logger.debug("Access Or Password Error")
-                return False
-            elif rtncode == 0x41:
-                self.logger.debug("Parameter Invalid")
-                return False
-            elif rtncode == 0x42:
-                self.logger.debug("Parameter Invalid WordCnt Too Long")
-                return False
-            elif rtncode == 0x43:
-                self.logger.debug("Parameter Invalid Membank Out Of Range")
-                return False
-            elif rtncode == 0x44:
-                self.logger.debug("Parameter Invalid Lock Region Out Of Range")
-                return False
-            elif rtncode == 0x45:
-                self.logger.debug("Parameter Invalid Lock Action Out Of Range")
-                return False
-            elif rtncode == 0x46:
-                self.logger.debug("Parameter Reader Address Invalid")
-                return False
-            elif rtncode == 0x47:
-                self.logger.debug("Parameter Invalid AntennaId Out Of Range")
-                return False
-            elif rtncode == 0x48:
-                self.logger.debug("Parameter Invalid Output Power Out Of Range")
-                return False
-            elif rtncode == 0x49:
-                self.logger.debug("Parameter Invalid Frequency Region Out Of Range")
-                return False
-            elif rtncode == 0x4A:
-                self.logger.debug("Parameter Invalid Baudrate Out Of Range")
-                return False
-            elif rtncode == 0x4B:
-                self.logger.debug("Parameter Beeper Mode Out Of Range")
-                return False
-            elif rtncode == 0x4C:
-                self.logger.debug("Parameter Epc Match Len Too Long")
-                return False
-            elif rtncode == 0x4D:
-                self.logger.debug("Parameter Epc Match Len Error")
-                return False
-            elif rtncode == 0x4E:
-                self.logger.debug("Parameter Invalid Epc Match Mode")
-                return False
-            elif rtncode == 0x4F:
-                self.logger.debug("Parameter Invalid Frequency Range")
-                return False
-            elif rtncode == 0x50:
-                self.logger.debug("Fail To Get RN16 From Tag")
-                return False
-            elif rtncode == 0x51:
-                self.logger.debug("Parameter Invalid Drm Mode")
-                return False
-            elif rtncode == 0x52:
-                self.logger.debug("Pll Lock Fail")
-                return False
-            elif rtncode == 0x53:
-                self.logger.debug("Rf Chip Fail To Response")
-                return False
-            elif rtncode == 0x54:
-                self.logger.debug("Fail To Achieve Desired Output Power")
-                return False
-            elif rtncode == 0x55:
-                self.logger.debug("Copyright Authentication Fail")
-                return False
-            elif rtncode == 0x56:
-                self.logger.debug("Spectrum Regulation Error")
-                return False
-            elif rtncode == 0x57:
-                self.logger.debug("Output Power Too Low")
-                return False
+        self.logger.debug(ReaderModule.ERROR_CODES.get(rtncode, "Unknown Error"))
+        return False
             
     """
     Data record process (DB & Disk)
@@ -1171,7 +992,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.tableView.setModel(self.model)
         self.lbInventoryQuantity.setText(str(0).zfill(4))
         self.lbTime.setText("0.0 sec.")
-        self.tags[:] = []
+        self.tagStore.clear()
         
     """
     Btn Start Inventory
@@ -1213,9 +1034,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def btn_reader_connect_click(self):
         self.set_digital_input()
         self.set_digital_output()
-        if not window.rs232.isConnect():
+        if not self.connection.isConnect():
             print ("Connecting...")
-            self.rs232.connect()
+            try:
+                self.connection.connect()
+            except Exception as err:
+                self.logger.debug("Error: {0}".format(err))
+                return
             self.btnReaderConnect.setText("Disconnect")
             self.lbConnectStatus.setText("Connected")
             self.lbConnectLight.setPixmap(self.greenLight)
@@ -1228,7 +1053,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.monitorSignal.emit()
         else:
             self.gpio.btn_stop_click()
-            self.rs232.disConnect()
+            self.connection.disConnect()
             self.btnReaderConnect.setText("Connect")
             self.lbConnectStatus.setText("Disconnected")
             self.lbConnectLight.setPixmap(self.redLight)
@@ -1489,7 +1314,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.set_digital_input()
         self.set_digital_output()
         
-        if not window.rs232.isConnect():
+        if not self.connection.isConnect():
             self.btnInventoryStart.setDisabled(True)
         else:
             self.btnInventoryStart.setDisabled(False)
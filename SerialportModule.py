@@ -1,35 +1,95 @@
 # coding=UTF-8
 
+import os
 import sys
 import glob
+import select
 import serial
 import time
 
-class RS232:
-    def __init__(self, port, baudrate):
+import TransportModule
+import PortEnumerator
+
+class RS232(TransportModule.Transport):
+    """
+    lowLatency: serRead waits on the port's fd and returns as soon as the
+    received frames are complete, instead of read(4096) running into the
+    timeout (POSIX only, Windows keeps the timeout read)
+    """
+    def __init__(self, port, baudrate, lowLatency=True):
+        TransportModule.Transport.__init__(self)
         self.Baudrates = ["115200", "38400"]
         self.Port = port
         self.Baudrate = baudrate
         self.Serial = serial.Serial()
         self.dataBuffer = ""
+        self.lowLatency = lowLatency and os.name == 'posix'
+        # USB serial number of the reader's adapter, connect() looks its port up
+        self.serialNumber = None
 
     def connect(self):
-        self.Serial = serial.Serial(port=self.Port, baudrate=self.Baudrate,timeout=0.2)
+        if self.serialNumber:
+            port = PortEnumerator.enumerator.findBySerial(self.serialNumber)
+            if port is not None:
+                self.Port = port
+        self.Serial = serial.Serial(port=self.Port, baudrate=self.Baudrate,timeout=self.readTimeout)
         if not self.Serial.isOpen:
             self.Serial.open()
 
     def isConnect(self):
         return self.Serial.isOpen()
 
-    def serWrite(self, cmd):
-        self.Serial.write(cmd)
+    def rawWrite(self, data):
+        self.Serial.write(data)
 
-    def serRead(self):
+    def rawRead(self):
         try:
+            if self.lowLatency:
+                return self.readFrames()
             data = self.Serial.read(4096)
             return data
         except Exception as err:
             print ("GetReceiveDataError: {0}".format(err))
+
+    """
+    Wait for data on the fd, take exactly in_waiting bytes, and while the
+    last frame is incomplete wait for its remaining bytes only
+    """
+    def readFrames(self):
+        fd = self.Serial.fileno()
+        deadline = time.monotonic() + self.readTimeout
+        data = bytearray()
+        missing = 1
+        while missing > 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                break
+            data += self.Serial.read(self.Serial.in_waiting or 1)
+            missing = self.missingBytes(data)
+        return bytes(data)
+
+    """
+    Bytes still needed to complete the last frame in data, frames are
+    Head(0xA0) Len ... with Len + 2 bytes in total
+    """
+    @staticmethod
+    def missingBytes(data):
+        dataLen = len(data)
+        head = data.find(0xA0)
+        while 0 <= head < dataLen:
+            if head + 1 >= dataLen:
+                return 1
+            frameLen = data[head + 1] + 2
+            if frameLen < 5:
+                head = data.find(0xA0, head + 1)
+                continue
+            if head + frameLen > dataLen:
+                return head + frameLen - dataLen
+            head = data.find(0xA0, head + frameLen)
+        return 0
     
     def serInWaiting(self):
         return self.Serial.inWaiting()
@@ -44,6 +104,7 @@ class RS232:
             print ("GetReceiveDataError: {0}".format(err))
     
     def clear(self):
+        self.dropQueued()
         self.Serial.reset_input_buffer()
         self.Serial.reset_output_buffer()
 
@@ -53,6 +114,14 @@ class RS232:
     def getBaudRate(self):
         return self.Baudrate
 
+    """
+    Change the host side rate, the open port is reconfigured in place
+    """
+    def setBaudRate(self, baudrate):
+        self.Baudrate = baudrate
+        if self.Serial.isOpen():
+            self.Serial.baudrate = baudrate
+
     def getBaudRates(self):
         return self.Baudrates
 
@@ -67,7 +136,10 @@ class RS232:
             """
         if sys.platform.startswith('win'):
             ports = ['COM%s' % (i + 1) for i in range(256)]
-        elif sys.platform.startswith('linux') or sys.platform.startswith('cygwin'):
+        elif sys.platform.startswith('linux'):
+            # sysfs metadata, cached, no device is opened
+            return PortEnumerator.enumerator.devices()
+        elif sys.platform.startswith('cygwin'):
             # this excludes your current terminal "/dev/tty"
             ports = glob.glob('/dev/tty[A-Za-z]*')
         elif sys.platform.startswith('darwin'):
@@ -89,21 +161,42 @@ class RS232:
         return result
     
 """
-import ReaderModule
-reader = ReaderModule.ReaderModule()
-rs232 = RS232('/dev/ttyUSB0', 115200)
-rs232.connect()
-
-while True: 
-    rs232.serWrite(reader.getFirmwareVersion())
-    time.sleep(1)
-    data = rs232.serRead()
-    msgTranArr = reader.analyzeDataAll(data)
-    for msgTran in msgTranArr:
-        for d in msgTran.databarr:
-            print (d)
+Command latency, timeout read against low latency read
+usage: python SerialportModule.py /dev/ttyUSB0 [baudrate] [count]
 """
-        
-    
-
-
+def measure_latency(port, baudrate, lowLatency, count):
+    import threading
+    import ReaderModule
+    reader = ReaderModule.ReaderModule()
+    rs232 = RS232(port, baudrate, lowLatency)
+    rs232.connect()
+    running = True
+
+    def receive():
+        while running:
+            data = rs232.serRead()
+            if data:
+                for msgTran in reader.analyzeDataAll(data):
+                    reader.resolveResponse(msgTran)
+
+    receiveThread = threading.Thread(target=receive)
+    receiveThread.start()
+    frame = reader.getReaderTemperature()
+    for i in range(count):
+        try:
+            reader.request(rs232, frame, retries=0).result()
+        except Exception as err:
+            print ("Error: {0}".format(err))
+    running = False
+    receiveThread.join()
+    rs232.disConnect()
+    print ("lowLatency" if lowLatency else "read(4096) timeout")
+    for line in reader.latency.report():
+        print (line)
+
+if __name__ == '__main__':
+    port = sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyUSB0'
+    baudrate = int(sys.argv[2]) if len(sys.argv) > 2 else 115200
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    measure_latency(port, baudrate, False, count)
+    measure_latency(port, baudrate, True, count)
@@ -12,6 +12,7 @@ from configparser import SafeConfigParser
 import frmSetting
 from frmSetting import Ui_MainWindow
 import SerialportModule
+import PortEnumerator
 import SocketModule
 import ReaderModule
 import SuperIOModule
@@ -593,7 +594,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             """
         if sys.platform.startswith('win'):
             ports = ['COM%s' % (i + 1) for i in range(256)]
-        elif sys.platform.startswith('linux') or sys.platform.startswith('cygwin'):
+        elif sys.platform.startswith('linux'):
+            # sysfs metadata, cached, no device is opened
+            return PortEnumerator.enumerator.devices()
+        elif sys.platform.startswith('cygwin'):
             # this excludes your current terminal "/dev/tty"
             ports = glob.glob('/dev/tty[A-Za-z]*')
         elif sys.platform.startswith('darwin'):
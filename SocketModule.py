@@ -1,47 +1,177 @@
 # coding=UTF-8
-# Echo client program
+# TCP reader transport
+import selectors
 import socket
+import threading
+import time
+
+import TransportModule
+
+class SocketModule(TransportModule.Transport):
+    """
+    Non-blocking TCP connection to a network reader.
+
+    TCP_NODELAY sends every command frame at once, keepalive finds a dead
+    link while the gate is idle. After connect() the connection is kept:
+    when the link drops, serRead / serWrite reconnect with a growing
+    delay (reconnectDelay doubling up to maxReconnectDelay).
+
+    The receive and inventory threads both read, write and drop the link,
+    so Socket and the selector registrations change under socketLock
+    only, and only the read path selects on selector; a write waiting for
+    send buffer space selects on writeSelector.
+    """
+    connectTimeout = 3.0
+    writeTimeout = 3.0
+    reconnectDelay = 0.5
+    maxReconnectDelay = 30.0
 
-class SocketModule:
     def __init__(self, host, port):
+        TransportModule.Transport.__init__(self)
         self.Host = host
         self.Port = port
-        self.Socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.Socket = None
+        self.selector = selectors.DefaultSelector()
+        self.writeSelector = selectors.DefaultSelector()
+        self.socketLock = threading.RLock()
         self.isconnect = False
+        self.delay = self.reconnectDelay
+        self.nextReconnect = 0.0
 
     def connect(self):
-        self.Socket.connect((self.Host, self.Port))
+        self.delay = self.reconnectDelay
+        self.open()
         self.isconnect = True
 
+    def open(self):
+        sock = socket.create_connection((self.Host, self.Port), self.connectTimeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # Linux: first probe after 10s idle, every 3s, 3 probes
+        for option, value in (('TCP_KEEPIDLE', 10), ('TCP_KEEPINTVL', 3), ('TCP_KEEPCNT', 3)):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+        sock.setblocking(False)
+        with self.socketLock:
+            self.selector.register(sock, selectors.EVENT_READ)
+            self.writeSelector.register(sock, selectors.EVENT_WRITE)
+            self.Socket = sock
+            self.delay = self.reconnectDelay
+
+    """
+    Close the socket, a no-op when it is closed already
+    """
+    def close(self):
+        with self.socketLock:
+            sock = self.Socket
+            if sock is None:
+                return
+            self.Socket = None
+            self.selector.unregister(sock)
+            self.writeSelector.unregister(sock)
+            sock.close()
+
+    """
+    Link dropped, try again after the backoff delay.
+    sock: the socket that failed, ignored when the link was opened again meanwhile
+    """
+    def linkDown(self, err, sock=None):
+        with self.socketLock:
+            if sock is not None and sock is not self.Socket:
+                return
+            print ("Socket Error: {0}".format(err))
+            self.close()
+            self.nextReconnect = time.monotonic() + self.delay
+            self.delay = min(self.delay * 2, self.maxReconnectDelay)
+
+    """
+    The open socket or None, reconnecting when it is due
+    """
+    def ensureOpen(self):
+        with self.socketLock:
+            if self.Socket is not None:
+                return self.Socket
+            if not self.isconnect or time.monotonic() < self.nextReconnect:
+                return None
+            try:
+                self.open()
+                return self.Socket
+            except OSError as err:
+                self.linkDown(err)
+                return None
+
     def isConnect(self):
         return self.isconnect
 
-    def sendCmd(self, cmd):
-        self.Socket.send(cmd)
-        try:
-            data = self.Socket.recv(4096)
-            return data
-        except Exception as err:
-            print ("GetReceiveDataError: {0}".format(err.message))
-        # try:
-        #     self.Socket.send(cmd)
-        #     data = self.Socket.recv(4096)
-        #     return data
-        # except socket.timeout as tout:
-        #     print "Socket Timeout: {0}".format(tout.message)
-        # except socket.error as err:
-        #     print "Socket Error: {0}".format(err.message)
-        return None
-
-    def disConnect(self):
-        #self.Socket.shutdown(socket.SHUT_RDWR)
-        self.Socket.close()
-        self.isconnect = False
+    """
+    Holds socketLock for the whole frame, so close() can not run in between.
+    A reader that stops draining the socket drops the link after writeTimeout
+    """
+    def rawWrite(self, data):
+        with self.socketLock:
+            sock = self.ensureOpen()
+            if sock is None:
+                raise ConnectionError("Reader {0}:{1} not connected".format(self.Host, self.Port))
+            view = memoryview(data)
+            deadline = time.monotonic() + self.writeTimeout
+            try:
+                while view:
+                    try:
+                        sent = sock.send(view)
+                        view = view[sent:]
+                    except BlockingIOError:
+                        # Send buffer full, wait until it drains
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError("Reader {0}:{1} stopped reading".format(self.Host, self.Port))
+                        self.writeSelector.select(self.readTimeout)
+            except OSError as err:
+                self.linkDown(err, sock)
+                raise
 
-    def readData(self):
-        data = self.Socket.recv(4096)
+    def rawRead(self):
+        sock = self.ensureOpen()
+        if sock is None:
+            time.sleep(self.readTimeout)
+            return b''
+        if not self.selector.select(self.readTimeout):
+            return b''
+        try:
+            data = sock.recv(4096)
+        except BlockingIOError:
+            return b''
+        except OSError as err:
+            self.linkDown(err, sock)
+            return b''
+        if not data:
+            self.linkDown("connection closed by reader", sock)
         return data
 
+    def serInWaiting(self):
+        sock = self.Socket
+        if sock is None:
+            return 0
+        try:
+            return len(sock.recv(4096, socket.MSG_PEEK))
+        except BlockingIOError:
+            return 0
+        except OSError as err:
+            self.linkDown(err, sock)
+            return 0
 
+    def clear(self):
+        self.dropQueued()
+        while self.serInWaiting():
+            sock = self.Socket
+            if sock is None:
+                break
+            try:
+                sock.recv(4096)
+            except OSError:
+                break
 
+    def disConnect(self):
+        self.isconnect = False
+        self.close()
 
+    def readData(self):
+        return self.serRead()
@@ -0,0 +1,37 @@
+# coding=UTF-8
+from collections import deque
+
+import LatencyHistogram
+
+class TagEventQueue:
+    """
+    Tag reads from the receive thread to the GUI thread.
+
+    put() is a deque append, atomic in CPython, so the receive thread
+    never waits for the GUI. The GUI drains the queue once per frame tick
+    and handles the reads as one batch. Only the GUI thread calls drain(),
+    so the length it reads is never more than what it can pop.
+    Batch sizes are counted in a LatencyHistogram.
+    """
+    def __init__(self):
+        self.events = deque()
+        self.batchSizes = LatencyHistogram.LatencyHistogram(title="Tag batches", unit="", scale=1)
+
+    def resetStats(self):
+        self.batchSizes.reset()
+
+    def put(self, *event):
+        self.events.append(event)
+
+    """
+    Every event queued so far, oldest first
+    """
+    def drain(self):
+        events = self.events
+        batch = [events.popleft() for i in range(len(events))]
+        if batch:
+            self.batchSizes.add(len(batch))
+        return batch
+
+    def report(self):
+        return self.batchSizes.report()
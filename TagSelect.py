@@ -0,0 +1,141 @@
+# coding=UTF-8
+import threading
+
+"""
+One prefix mask
+membank: 0x01 EPC, 0x02 TID, 0x03 USER; startAddress and maskLen in bits
+"""
+class TagMask:
+    MEMBANKS = {'EPC': 0x01, 'TID': 0x02, 'USER': 0x03}
+    # EPC bank: CRC(16) PC(16) EPC, the EPC starts at bit 0x20
+    DEFAULT_START = {0x01: 0x20, 0x02: 0x00, 0x03: 0x00}
+
+    def __init__(self, membank, startAddress, mask, maskLen):
+        self.membank = membank
+        self.startAddress = startAddress
+        self.mask = mask
+        self.maskLen = maskLen
+
+    """
+    spec: BANK:HEXPREFIX[:STARTBIT], e.g. EPC:E280 or TID:E2801160:0
+    """
+    @classmethod
+    def parse(cls, spec):
+        fields = spec.strip().split(':')
+        if len(fields) < 2 or fields[0].upper() not in cls.MEMBANKS:
+            raise ValueError("Invalid tag mask: {0}".format(spec))
+        membank = cls.MEMBANKS[fields[0].upper()]
+        prefix = fields[1].strip()
+        startAddress = int(fields[2]) if len(fields) > 2 else cls.DEFAULT_START[membank]
+        maskLen = len(prefix) * 4
+        # Odd digit count: pad the last byte, maskLen keeps the real bit count
+        mask = bytes.fromhex(prefix + '0' * (len(prefix) % 2))
+        return cls(membank, startAddress, mask, maskLen)
+
+    """
+    Host side check of an inventory record, only EPC bank masks past the CRC
+    can be checked, everything else passes
+    """
+    def matches(self, pc, epc):
+        if self.membank != 0x01 or self.startAddress < 0x10:
+            return True
+        data = pc.to_bytes(2, 'big') + epc
+        offset = self.startAddress - 0x10
+        dataBits = len(data) * 8
+        if offset + self.maskLen > dataBits:
+            return False
+        value = int.from_bytes(data, 'big') >> (dataBits - offset - self.maskLen)
+        value &= (1 << self.maskLen) - 1
+        return value == int.from_bytes(self.mask, 'big') >> (len(self.mask) * 8 - self.maskLen)
+
+class TagSelect:
+    """
+    Reader side tag select (0x98) from the [Select] config section.
+
+    masks:  comma separated TagMask specs, empty for no filtering
+    target: flag the select sets, S0 ~ S3 or SL (default SL, so the
+            inventoried flags used by the session / target strategy
+            are left alone)
+
+    The first mask asserts matching tags and deasserts the others, each
+    further mask asserts its matches too, so a tag passes when it matches
+    any mask. The reader takes up to 5 masks.
+
+    Frames come from program(), the mask frames answering tagSelectQuery
+    are collected by queryRecord() and checked by verify(). Inventory records
+    still go through accept(), which counts tags that should have been
+    filtered by the reader and drops them on the host.
+    """
+    TARGETS = {'S0': 0x00, 'S1': 0x01, 'S2': 0x02, 'S3': 0x03, 'SL': 0x04}
+    MAX_MASKS = 5
+    ACTION_FIRST = 0x00 # matching assert, non-matching deassert
+    ACTION_NEXT = 0x01 # matching assert, non-matching unchanged
+
+    def __init__(self, masks, target='SL'):
+        self.masks = [TagMask.parse(spec) for spec in masks.split(',') if spec.strip()]
+        if len(self.masks) > self.MAX_MASKS:
+            raise ValueError("At most {0} tag masks".format(self.MAX_MASKS))
+        self.target = self.TARGETS.get(target.strip().upper(), 0x04)
+        self.queried = {}
+        self.queryDone = threading.Event()
+        self.resetCounters()
+
+    def active(self):
+        return len(self.masks) > 0
+
+    def resetCounters(self):
+        self.passedTags = 0
+        self.filteredTags = 0
+
+    def action(self, index):
+        return self.ACTION_FIRST if index == 0 else self.ACTION_NEXT
+
+    """
+    Clear every mask on the reader, then set ours
+    """
+    def program(self, reader):
+        frames = [reader.tagSelectClear(0x00)]
+        for index, mask in enumerate(self.masks):
+            frames.append(reader.tagSelect(index + 1, self.target, self.action(index), mask.membank,
+                                           mask.startAddress, mask.maskLen, mask.mask))
+        return frames
+
+    """
+    Query answer, frames by mask number, fed from the receive thread
+    """
+    def beginQuery(self):
+        self.queried = {}
+        self.queryDone.clear()
+
+    def queryRecord(self, record):
+        self.queried[record.maskNo] = record
+        if len(self.queried) >= record.maskCount:
+            self.queryDone.set()
+
+    """
+    True when the reader reports exactly our masks
+    """
+    def verify(self):
+        queried = [self.queried[maskNo] for maskNo in sorted(self.queried)]
+        if len(queried) != len(self.masks):
+            return False
+        for index, record in enumerate(queried):
+            mask = self.masks[index]
+            if (record.maskNo != index + 1 or record.target != self.target or record.action != self.action(index)
+                    or record.membank != mask.membank or record.startAddress != mask.startAddress
+                    or record.maskLen != mask.maskLen or record.mask != mask.mask):
+                return False
+        return True
+
+    """
+    True when the inventory record matches, counts the ones that leaked
+    """
+    def accept(self, record):
+        if not self.masks or any(mask.matches(record.pc, record.epc) for mask in self.masks):
+            self.passedTags += 1
+            return True
+        self.filteredTags += 1
+        return False
+
+    def report(self):
+        return "Select: {0} tags passed, {1} tags dropped on host".format(self.passedTags, self.filteredTags)
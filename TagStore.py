@@ -0,0 +1,211 @@
+# coding=UTF-8
+import threading
+import time
+from collections import OrderedDict, deque
+
+class TagEntry:
+    """
+    One tag of the session, firstSeen / lastSeen: time.monotonic_ns() of the reads
+    antennaCounts: reads per antenna (1 ~ 8), firstAntenna: antenna of the first read
+    row: table row of the tag, set by the UI
+    qualified / recentReads: set by TagQualifier
+    """
+    def __init__(self, key, epc, pc, tid, antenna, now):
+        self.key = key
+        self.epc = epc
+        self.pc = pc
+        self.tid = tid
+        self.row = None
+        self.qualified = False
+        self.recentReads = None
+        self.firstSeen = now
+        self.lastSeen = now
+        self.firstAntenna = antenna
+        self.antennaCounts = {}
+        self.count = 0
+        self.rssiMin = None
+        self.rssiMax = None
+        self.rssiTotal = 0
+        self.rssiCount = 0
+
+    def rssiMean(self):
+        return self.rssiTotal / self.rssiCount if self.rssiCount else None
+
+class TagStore:
+    """
+    Session tag table keyed by the raw EPC bytes, or (EPC, TID) with withTid,
+    upsert() and get() are dict lookups however many tags were read.
+
+    upsert() runs in the receive thread, the UI reads the entries, so
+    every change happens under the lock.
+    """
+    def __init__(self, withTid=False):
+        self.withTid = withTid
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.firstSeen = None
+
+    def key(self, epc, tid=b''):
+        return (epc, tid) if self.withTid else epc
+
+    """
+    Count one read, return (entry, True when the tag is new)
+    """
+    def upsert(self, epc, antenna, rssi=None, pc=None, tid=b'', now=None):
+        if now is None:
+            now = time.monotonic_ns()
+        key = self.key(epc, tid)
+        with self.lock:
+            entry = self.entries.get(key)
+            isNew = entry is None
+            if isNew:
+                entry = TagEntry(key, epc, pc, tid, antenna, now)
+                self.entries[key] = entry
+                if self.firstSeen is None:
+                    self.firstSeen = now
+            entry.lastSeen = now
+            entry.count += 1
+            entry.antennaCounts[antenna] = entry.antennaCounts.get(antenna, 0) + 1
+            if rssi is not None:
+                entry.rssiMin = rssi if entry.rssiMin is None else min(entry.rssiMin, rssi)
+                entry.rssiMax = rssi if entry.rssiMax is None else max(entry.rssiMax, rssi)
+                entry.rssiTotal += rssi
+                entry.rssiCount += 1
+        return entry, isNew
+
+    def get(self, epc, tid=b''):
+        return self.entries.get(self.key(epc, tid))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    """
+    Entries in first read order
+    """
+    def values(self):
+        with self.lock:
+            return list(self.entries.values())
+
+class TagDedup:
+    """
+    Suppress tags read again within ttl seconds of their last read,
+    kept across gate triggers (TagStore is cleared for every pass).
+
+    A tag counts once it was committed (looked up / sent by the UI), a
+    read that never reached the UI does not suppress the next trigger.
+    lastSeen is ordered oldest first: a read moves its key to the end,
+    expire() pops from the front until the first unexpired key, so it
+    costs the number of expired tags. ttl 0 suppresses nothing.
+    recent() runs in the receive thread, commit() in the GUI thread,
+    both under the lock.
+    """
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lastSeen = OrderedDict()
+        self.lock = threading.Lock()
+
+    def expire(self, now):
+        lastSeen = self.lastSeen
+        while lastSeen:
+            key, seen = next(iter(lastSeen.items()))
+            if now - seen < self.ttl:
+                break
+            lastSeen.popitem(last=False)
+
+    """
+    Count a read of key, True when key was committed and read within ttl
+    """
+    def recent(self, key, now=None):
+        if self.ttl <= 0:
+            return False
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            self.expire(now)
+            lastSeen = self.lastSeen
+            if key not in lastSeen:
+                return False
+            lastSeen[key] = now
+            lastSeen.move_to_end(key)
+            return True
+
+    """
+    Key was delivered, its later reads within ttl are suppressed
+    """
+    def commit(self, key, now=None):
+        if self.ttl <= 0:
+            return
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            self.lastSeen[key] = now
+            self.lastSeen.move_to_end(key)
+
+    def __len__(self):
+        return len(self.lastSeen)
+
+class TagQualifier:
+    """
+    Stray read filter: a tag is qualified (committed to the DB / API
+    pipeline) after reads reads within window seconds, counting only
+    reads at or above the RSSI threshold of their antenna.
+
+    rssiThresholds: dBm per antenna (index antenna - 1), one value for
+    every antenna, or empty for no threshold. Reads without RSSI are
+    counted. Once qualified a tag stays qualified for the pass.
+    Used by the receive thread only.
+    """
+    def __init__(self, reads=1, window=1.0, rssiThresholds=()):
+        self.reads = max(1, reads)
+        self.windowNs = int(window * 1e9)
+        self.rssiThresholds = list(rssiThresholds)
+        self.resetStats()
+
+    def resetStats(self):
+        self.weakReads = 0
+
+    def threshold(self, antenna):
+        if len(self.rssiThresholds) == 1:
+            return self.rssiThresholds[0]
+        if 0 < antenna <= len(self.rssiThresholds):
+            return self.rssiThresholds[antenna - 1]
+        return None
+
+    """
+    Count the read (entry.lastSeen is its time), return entry.qualified
+    """
+    def qualify(self, entry, antenna, rssi=None):
+        if entry.qualified:
+            return True
+        threshold = self.threshold(antenna)
+        if rssi is not None and threshold is not None and rssi < threshold:
+            self.weakReads += 1
+            return False
+        if self.reads == 1:
+            entry.qualified = True
+            return True
+        recentReads = entry.recentReads
+        if recentReads is None:
+            recentReads = entry.recentReads = deque()
+        now = entry.lastSeen
+        recentReads.append(now)
+        while now - recentReads[0] > self.windowNs:
+            recentReads.popleft()
+        if len(recentReads) >= self.reads:
+            entry.qualified = True
+            entry.recentReads = None
+        return entry.qualified
+
+    """
+    Stray tags: read in this pass but never qualified
+    """
+    def report(self, tagStore):
+        strays = sum(1 for entry in tagStore.values() if not entry.qualified)
+        return "Qualify: {0} stray tags rejected, {1} reads below RSSI threshold".format(strays, self.weakReads)
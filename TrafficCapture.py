@@ -0,0 +1,156 @@
+# coding=UTF-8
+import queue
+import struct
+import sys
+import threading
+import time
+
+import TransportModule
+
+"""
+Capture file
+Header: MAGIC, start wall clock (Q, ns since epoch)
+Record: offset (Q, ns since capture start) direction (B) length (I) data
+"""
+MAGIC = b'RFCAP\x01'
+HEADER = struct.Struct('>Q')
+RECORD = struct.Struct('>QBI')
+TX = 0x00
+RX = 0x01
+
+class CaptureWriter:
+    """
+    Append timestamped TX / RX chunks to a capture file.
+
+    record() only stamps the chunk and puts it on a queue, so the reader
+    threads never wait for the disk; a background thread packs and writes.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.captureFile = open(path, 'wb')
+        self.captureFile.write(MAGIC)
+        self.captureFile.write(HEADER.pack(time.time_ns()))
+        self.start = time.monotonic_ns()
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.writeLoop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def record(self, direction, data):
+        self.queue.put((time.monotonic_ns() - self.start, direction, data))
+
+    def writeLoop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            offset, direction, data = item
+            self.captureFile.write(RECORD.pack(offset, direction, len(data)))
+            self.captureFile.write(data)
+        self.captureFile.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+"""
+Yield (offset ns, direction, data) of every record in a capture file
+"""
+def readCapture(path):
+    with open(path, 'rb') as captureFile:
+        if captureFile.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{0} is not a capture file".format(path))
+        captureFile.read(HEADER.size)
+        while True:
+            head = captureFile.read(RECORD.size)
+            if len(head) < RECORD.size:
+                break
+            offset, direction, length = RECORD.unpack(head)
+            data = captureFile.read(length)
+            if len(data) < length:
+                break
+            yield offset, direction, data
+
+class ReplayTransport(TransportModule.Transport):
+    """
+    Transport that plays the RX side of a capture back, so ReaderModule
+    and the Main pipeline run on recorded traffic without a reader.
+
+    speed: 1.0 real time, 2.0 twice as fast, 0 as fast as possible.
+    Writes are dropped (counted in framesWritten).
+    """
+    def __init__(self, path, speed=1.0):
+        TransportModule.Transport.__init__(self)
+        self.path = path
+        self.speed = speed
+        self.records = None
+        self.isconnect = False
+
+    def connect(self):
+        self.records = (record for record in readCapture(self.path) if record[1] == RX)
+        self.start = time.monotonic()
+        self.firstOffset = None
+        self.isconnect = True
+
+    def disConnect(self):
+        self.isconnect = False
+
+    def isConnect(self):
+        return self.isconnect
+
+    def rawWrite(self, data):
+        pass
+
+    def rawRead(self):
+        if not self.isconnect:
+            return b''
+        record = next(self.records, None)
+        if record is None:
+            # End of capture
+            self.isconnect = False
+            return b''
+        offset, direction, data = record
+        if self.firstOffset is None:
+            self.firstOffset = offset
+        if self.speed > 0:
+            due = self.start + (offset - self.firstOffset) / 1e9 / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def serInWaiting(self):
+        return 0
+
+    def clear(self):
+        self.dropQueued()
+
+"""
+Offline replay of a capture through ReaderModule
+usage: python TrafficCapture.py capture.bin [speed]   (speed 0: max)
+"""
+if __name__ == '__main__':
+    import ReaderModule
+    path = sys.argv[1]
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    reader = ReaderModule.ReaderModule()
+    transport = ReplayTransport(path, speed)
+    transport.connect()
+    frames = {}
+    tags = set()
+    rxBytes = 0
+    begin = time.perf_counter()
+    while transport.isConnect():
+        data = transport.serRead()
+        rxBytes += len(data)
+        for msgTran in reader.analyzeDataAll(data):
+            frames[msgTran.cmd] = frames.get(msgTran.cmd, 0) + 1
+            record = reader.parseResponse(msgTran.cmd, msgTran.databarr)
+            if type(record) in (ReaderModule.InventoryRecord, ReaderModule.BufferTagRecord):
+                tags.add(record.epc)
+    elapsed = time.perf_counter() - begin
+    txCount = sum(1 for record in readCapture(path) if record[1] == TX)
+    print ("TX chunks: {0}, RX bytes: {1}, replay {2:.3f}s".format(txCount, rxBytes, elapsed))
+    for cmd in sorted(frames):
+        print ("cmd 0x{0:02X}: {1} frames".format(cmd, frames[cmd]))
+    print ("unique tags: {0}".format(len(tags)))
@@ -0,0 +1,140 @@
+# coding=UTF-8
+import threading
+
+class Transport:
+    """
+    Byte stream to the reader, shared by RS232 and SocketModule.
+
+    serRead waits at most readTimeout seconds and returns the bytes
+    received (b'' when there are none), the caller feeds them to
+    ReaderModule.analyzeDataAll.
+
+    Outbound frames go through one ordered queue. queueWrite() only
+    appends, the queue is written at the latest coalesceWindow seconds
+    later. serWrite() appends and writes the whole queue at once, so
+    frames queued before a latency critical command leave in the same
+    write() and in their original order.
+
+    startCapture() records every written and read chunk to a capture file
+    (see TrafficCapture). Subclasses implement rawWrite() and rawRead().
+    """
+    readTimeout = 0.2
+    coalesceWindow = 0.005
+
+    def __init__(self):
+        self.writeQueue = bytearray()
+        self.writeLock = threading.Lock()
+        self.flushTimer = None
+        self.framesWritten = 0
+        self.writeCalls = 0
+        self.capture = None
+
+    def connect(self):
+        raise NotImplementedError
+
+    def disConnect(self):
+        raise NotImplementedError
+
+    def isConnect(self):
+        raise NotImplementedError
+
+    def rawWrite(self, data):
+        raise NotImplementedError
+
+    def rawRead(self):
+        raise NotImplementedError
+
+    """
+    Queue cmd and write it with everything queued before it
+    """
+    def serWrite(self, cmd):
+        with self.writeLock:
+            self.writeQueue += cmd
+            self.framesWritten += 1
+            self.writeQueued()
+
+    """
+    Queue cmd, it leaves with the next serWrite or after coalesceWindow
+    """
+    def queueWrite(self, cmd):
+        with self.writeLock:
+            self.writeQueue += cmd
+            self.framesWritten += 1
+            if self.flushTimer is None:
+                self.flushTimer = threading.Timer(self.coalesceWindow, self.flush)
+                self.flushTimer.daemon = True
+                self.flushTimer.start()
+
+    def flush(self):
+        with self.writeLock:
+            if self.writeQueue:
+                self.writeQueued()
+
+    # Called with writeLock held
+    def writeQueued(self):
+        if self.flushTimer is not None:
+            self.flushTimer.cancel()
+            self.flushTimer = None
+        data = bytes(self.writeQueue)
+        self.writeQueue.clear()
+        self.writeCalls += 1
+        # stopCapture can run in the GUI thread meanwhile, read capture once
+        capture = self.capture
+        if capture is not None:
+            capture.record(0x00, data)
+        self.rawWrite(data)
+
+    def dropQueued(self):
+        with self.writeLock:
+            if self.flushTimer is not None:
+                self.flushTimer.cancel()
+                self.flushTimer = None
+            self.writeQueue.clear()
+
+    def writeReport(self):
+        return "Writes: {0} frames in {1} write calls".format(self.framesWritten, self.writeCalls)
+
+    def resetWriteStats(self):
+        self.framesWritten = 0
+        self.writeCalls = 0
+
+    def serRead(self):
+        data = self.rawRead()
+        capture = self.capture
+        if data and capture is not None:
+            capture.record(0x01, data)
+        return data
+
+    def startCapture(self, path):
+        import TrafficCapture
+        self.stopCapture()
+        self.capture = TrafficCapture.CaptureWriter(path)
+
+    def stopCapture(self):
+        capture = self.capture
+        self.capture = None
+        if capture is not None:
+            capture.close()
+
+    """
+    Number of received bytes ready to read
+    """
+    def serInWaiting(self):
+        raise NotImplementedError
+
+    """
+    Drop received and unsent data
+    """
+    def clear(self):
+        raise NotImplementedError
+
+    """
+    Send and return whatever arrives within readTimeout
+    """
+    def sendCmd(self, cmd):
+        try:
+            self.serWrite(cmd)
+            return self.serRead()
+        except Exception as err:
+            print ("GetReceiveDataError: {0}".format(err))
+        return None